@@ -0,0 +1,104 @@
+"""
+Batch mode - runs several cohorts (mahzors) in one process.
+
+The imports, the compiled template and, with --workers, one process pool are shared by all the cohorts.
+Every cohort is written to its own tree under the output root, named after its answers file:
+
+    python batch.py output_root mahzor_1.xlsx mahzor_2.xlsx --workers 8
+        output_root/mahzor_1/<commander>.docx
+        output_root/mahzor_1/excel/<commander>.xlsx
+        ...
+
+With --zip every cohort is written as one archive instead, output_root/mahzor_1.zip.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import instrumentation
+import strol_code
+from constants import *
+
+
+def get_cohort_names(file_paths: list[str]) -> Dict[str, str]:
+    """
+    Returns answers file -> cohort directory name (the file name without extension, suffixed if repeated).
+    A file passed more than once is run once.
+    """
+    names: Dict[str, str] = {}
+    used: set[str] = set()
+    seen_paths: set[str] = set()
+    for file_path in file_paths:
+        absolute_path = os.path.abspath(file_path)
+        if absolute_path in seen_paths:
+            print(f"Skipping {file_path}, already in the batch.")
+            continue
+        seen_paths.add(absolute_path)
+
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        name = base_name
+        suffix = 2
+        while name in used:
+            name = f"{base_name}_{suffix}"
+            suffix += 1
+        used.add(name)
+        names[file_path] = name
+    return names
+
+
+def run_batch(file_paths: list[str], output_root: str, workers: Optional[int] = DEFAULT_WORKERS,
+              incremental: bool = INCREMENTAL_BUILD, delta: bool = DELTA_INGESTION,
+              archive: bool = False) -> Dict[str, bool]:
+    """
+    Runs every answers file as a cohort under output_root.
+    archive - write each cohort as output_root/<cohort>.zip.
+    Returns cohort name -> whether all of its reports were written.
+    """
+    cohort_names = get_cohort_names(file_paths)
+    results: Dict[str, bool] = {}
+
+    def run_cohorts(executor: Optional[ProcessPoolExecutor]):
+        for file_path, cohort in cohort_names.items():
+            print(f"=== Cohort {cohort} ({file_path})")
+            with instrumentation.stage("cohort"):
+                results[cohort] = strol_code.run_reports(
+                    file_path, workers, incremental, delta,
+                    output_root=os.path.join(output_root, cohort),
+                    executor=executor,
+                    archive_path=os.path.join(output_root, cohort + ".zip") if archive else None,
+                )
+
+    with instrumentation.instrumented_run():
+        if workers is None or workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                run_cohorts(executor)
+        else:
+            run_cohorts(None)
+
+    failed = [cohort for cohort, succeeded in results.items() if not succeeded]
+    if failed:
+        print(f"❌ Cohorts with failures: {', '.join(failed)}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the reports of several cohorts in one run.")
+    parser.add_argument("output_root")
+    parser.add_argument("answers_files", nargs="+")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="worker processes shared by all cohorts (0 = all cores)")
+    parser.add_argument("--full", action="store_true", help="rebuild every commander (no incremental build)")
+    parser.add_argument("--delta", action="store_true", default=DELTA_INGESTION,
+                        help="use delta ingestion for every cohort")
+    parser.add_argument("--zip", action="store_true", help="write each cohort as one zip archive")
+    args = parser.parse_args()
+
+    results = run_batch(args.answers_files, args.output_root, args.workers or None,
+                        incremental=INCREMENTAL_BUILD and not args.full, delta=args.delta,
+                        archive=args.zip)
+    raise SystemExit(0 if all(results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Benchmark of the report pipeline on synthetic answers.
+
+Generates an answers workbook that matches COLUMNS, runs it through run_reports() - the flow main() runs -
+and appends the timings of each stage (taken by the instrumentation hooks) as one JSON line to the results file.
+
+    python benchmark.py --rows 10000 --commanders 100
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+import instrumentation
+import strol_code
+from constants import *
+
+
+BENCHMARK_RESULTS_PATH = "benchmark_results.jsonl"
+
+# Probability of picking each number of statements in a multiple choice question (0 = left empty)
+CHOICES_PER_ANSWER_PROBABILITIES = [0.05, 0.35, 0.3, 0.2, 0.1]
+# Probability that a respondent picks "none of the above" instead of statements
+NONE_OF_THE_ABOVE_PROBABILITY = 0.1
+# Probability that an open question is left empty
+EMPTY_COMMENT_PROBABILITY = 0.4
+GENERAL_ANSWER_PROBABILITIES = [0.03, 0.05, 0.1, 0.22, 0.3, 0.3]
+
+HEBREW_COMMENT_WORDS = [
+    "מפקד", "מקצועי", "זמין", "נוכח", "משוב", "אכפתי", "הכשרה", "דוגמה", "אישית", "סמכותי",
+    "צריך", "לשפר", "את", "הזמינות", "בשיחות", "אישיות", "מאוד", "תמיד", "לפעמים", "הרבה",
+    "יותר", "פחות", "עם", "של", "על", "ההתנהלות", "בתוכנית", "לאורך", "כל", "התקופה",
+]
+COMMENT_PUNCTUATION = ["", "", "", ",", ".", "!", "?", ":", " (באמת)", " - חשוב"]
+
+
+def generate_comment(rng: np.random.Generator) -> str:
+    words = rng.choice(HEBREW_COMMENT_WORDS, size=int(rng.integers(1, 40)))
+    sentence = " ".join(words)
+    return sentence + COMMENT_PUNCTUATION[int(rng.integers(len(COMMENT_PUNCTUATION)))]
+
+
+def generate_multiple_choice_answer(rng: np.random.Generator, options: list[str]) -> Optional[str]:
+    num_choices = int(rng.choice(len(CHOICES_PER_ANSWER_PROBABILITIES), p=CHOICES_PER_ANSWER_PROBABILITIES))
+    if num_choices == 0:
+        return None
+    if rng.random() < NONE_OF_THE_ABOVE_PROBABILITY:
+        return NONE_OF_THE_ABOVE_OPTION
+
+    statements = [option for option in options if option != NONE_OF_THE_ABOVE_OPTION]
+    picked = sorted(rng.choice(len(statements), size=num_choices, replace=False))
+    # Google Forms lists the picked statements in the form's order
+    return ", ".join(statements[i] for i in picked)
+
+
+def iter_synthetic_rows(num_rows: int, num_commanders: int, seed: int = 0):
+    """
+    Yields answer rows in COLUMNS order, with the commanders' sizes skewed like real cohorts.
+    """
+    rng = np.random.default_rng(seed)
+    commanders = [f"מפקד {i + 1}" for i in range(num_commanders)]
+    weights = rng.pareto(2.0, size=num_commanders) + 1
+    commander_of_row = rng.choice(num_commanders, size=num_rows, p=weights / weights.sum())
+    start = datetime(2025, 10, 1)
+    # one comment pool per run keeps generation of large files fast while answers still repeat like real ones
+    comment_pool = [generate_comment(rng) for _ in range(min(num_rows, 5000) or 1)]
+
+    for row_index in range(num_rows):
+        row = {
+            TIMESTAMP_COLUMN: start + pd.Timedelta(seconds=30 * row_index),
+            COMMANDER_COLUMN: commanders[commander_of_row[row_index]],
+            GENERAL_QUESTION_COLUMN: int(rng.choice(6, p=GENERAL_ANSWER_PROBABILITIES)) + 1,
+        }
+        for question, options in QUESTION_TO_OPTIONS.items():
+            row[question] = generate_multiple_choice_answer(rng, options)
+        for question in OPEN_QUESTIONS_COLUMNS:
+            if rng.random() < EMPTY_COMMENT_PROBABILITY:
+                row[question] = None
+            else:
+                row[question] = comment_pool[int(rng.integers(len(comment_pool)))]
+
+        yield [row[column] for column in COLUMNS]
+
+
+def write_synthetic_answers(file_path: str, num_rows: int, num_commanders: int, seed: int = 0) -> list[str]:
+    """
+    Returns the commanders that got answers, in order of first appearance.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(COLUMNS)
+    commander_position = COLUMNS.index(COMMANDER_COLUMN)
+    commanders: Dict[str, None] = {}
+    for row in iter_synthetic_rows(num_rows, num_commanders, seed):
+        sheet.append(row)
+        commanders.setdefault(row[commander_position])
+    workbook.save(file_path)
+    return list(commanders)
+
+
+def measure_stage(stages: Dict[str, Dict], stage: str, func, *args, **kwargs):
+    """
+    Calls func and adds its wall and CPU time to stages[stage].
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = func(*args, **kwargs)
+    stats = stages.setdefault(stage, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+    stats["wall_s"] += time.perf_counter() - wall_start
+    stats["cpu_s"] += time.process_time() - cpu_start
+    stats["calls"] += 1
+    return result
+
+
+def run_benchmark(file_path: str, output_dir: str, commanders: Optional[list[str]] = None) -> Dict:
+    """
+    Runs file_path through run_reports() - sequentially, without incremental builds - writing the reports
+    under output_dir, and returns the time of every instrumented stage and the run's counters.
+    commanders - only render these commanders' reports (the cohort stats still run on every row).
+    """
+    stages: Dict[str, Dict] = {}
+    measure_stage(stages, "compile_template", strol_code.compile_template, TEMPLATE_PATH)
+
+    was_enabled = instrumentation.is_enabled()
+    instrumentation.enable()
+    instrumentation.reset()
+    try:
+        succeeded = measure_stage(stages, "run_reports", strol_code.run_reports, file_path, workers=1,
+                                  incremental=False, delta=False, output_root=output_dir, commanders=commanders)
+        metrics = instrumentation.snapshot()
+    finally:
+        instrumentation.enable(was_enabled)
+    if not succeeded:
+        raise ValueError(f"The reports of the synthetic answers in {file_path} failed")
+
+    stages.update(metrics["stages"])
+    return {
+        "rows": metrics["counters"].get("rows_loaded", 0),
+        "stages": stages,
+        "counters": metrics["counters"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the report pipeline on synthetic answers.")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--commanders", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-reports", type=int, default=None,
+                        help="render the reports of only this many commanders (stats still run for all)")
+    parser.add_argument("--results", default=BENCHMARK_RESULTS_PATH,
+                        help="JSON lines file the run is appended to")
+    parser.add_argument("--keep", metavar="DIR", default=None,
+                        help="keep the synthetic workbook and reports in DIR")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.keep or tmp_dir
+        answers_path = os.path.join(work_dir, "answers.xlsx")
+
+        generate_start = time.perf_counter()
+        commanders = write_synthetic_answers(answers_path, args.rows, args.commanders, args.seed)
+        generate_seconds = time.perf_counter() - generate_start
+
+        selected = None if args.max_reports is None else commanders[:args.max_reports]
+        result = run_benchmark(answers_path, work_dir, selected)
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "params": {
+            "rows": args.rows,
+            "commanders": args.commanders,
+            "seed": args.seed,
+            "max_reports": args.max_reports,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "generate_input_s": generate_seconds,
+        "commanders": len(commanders),
+        **result,
+    }
+
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    for stage, stats in result["stages"].items():
+        print(f"{stage:<35} {stats['wall_s']:>9.3f}s wall {stats['cpu_s']:>9.3f}s cpu  x{stats['calls']}")
+    print(f"Results appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
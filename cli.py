@@ -0,0 +1,136 @@
+"""
+Command line interface of the report generator.
+
+    python cli.py validate answers.xlsx
+    python cli.py stats answers.xlsx --commander "<name>"
+    python cli.py docx answers.xlsx --commander "<name>"
+    python cli.py excel answers.xlsx --output-root out/
+    python cli.py all answers.xlsx --workers 4 --zip out/reports.zip
+
+Every subcommand imports only what it needs: the report code is imported when a subcommand runs,
+and the Word stack (python-docx, docxtpl, Jinja2) only when docx reports are rendered.
+"""
+import argparse
+import json
+import sys
+
+from constants import *
+
+
+# The reports each report subcommand writes
+SUBCOMMAND_FORMATS = {
+    "docx": ("docx",),
+    "excel": ("excel",),
+    "all": REPORT_FORMATS,
+}
+
+
+def run_validate(args) -> int:
+    import strol_code
+
+    if not strol_code.validate_excel(args.answers_file):
+        return 1
+    print(f"✅ {args.answers_file} is valid.")
+    return 0
+
+
+def run_stats(args) -> int:
+    """
+    Prints the placeholder values of the cohort and of every (selected) commander as JSON.
+    """
+    import strol_code
+
+    df = strol_code.load_answers(args.answers_file, cache_dir=PARSED_CACHE_DIR if PARSED_CACHE else None)
+    if df is None:
+        return 1
+    cohort = strol_code.prepare_cohort(df)
+
+    commanders = args.commander or list(cohort["partitions"])
+    missing = [commander for commander in commanders if commander not in cohort["partitions"]]
+    if missing:
+        print(f"❌ No answers for commanders: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    stats = {
+        "cohort": cohort["mahzor_averages"],
+        "commanders": {
+            commander: {
+                **strol_code.calculations_on_seperated_data(
+                    cohort["partitions"][commander], commander,
+                    cohort["commander_counts"].get(commander), cohort["general_stats"].get(commander)),
+                **cohort["rankings"].get(commander, {}),
+            }
+            for commander in commanders
+        },
+    }
+    print(json.dumps(stats, ensure_ascii=False, indent=2, default=str))
+    return 0
+
+
+def run_report_subcommand(args) -> int:
+    import instrumentation
+    import strol_code
+
+    with instrumentation.instrumented_run():
+        succeeded = strol_code.run_reports(
+            args.answers_file, args.workers or None,
+            incremental=INCREMENTAL_BUILD and not args.full,
+            delta=args.delta,
+            output_root=args.output_root,
+            archive_path=args.zip,
+            commanders=args.commander,
+            formats=SUBCOMMAND_FORMATS[args.subcommand],
+            streaming=args.streaming,
+            pipelined=args.pipelined,
+            cohort_excel=args.cohort_excel,
+        )
+    return 0 if succeeded else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate the commanders' feedback reports.")
+    subparsers = parser.add_subparsers(dest="subcommand", required=True)
+
+    validate_parser = subparsers.add_parser("validate", help="check the answers workbook's columns")
+    validate_parser.add_argument("answers_file", nargs="?", default=INPUT_PATH)
+    validate_parser.set_defaults(handler=run_validate)
+
+    stats_parser = subparsers.add_parser("stats", help="print the computed values as JSON")
+    stats_parser.add_argument("answers_file", nargs="?", default=INPUT_PATH)
+    stats_parser.add_argument("--commander", action="append", help="only this commander (repeatable)")
+    stats_parser.set_defaults(handler=run_stats)
+
+    for subcommand, description in [("docx", "write the Word reports"),
+                                    ("excel", "write the Excel workbooks"),
+                                    ("all", "write the Word reports and the Excel workbooks")]:
+        report_parser = subparsers.add_parser(subcommand, help=description)
+        report_parser.add_argument("answers_file", nargs="?", default=INPUT_PATH)
+        report_parser.add_argument("--commander", action="append", help="only this commander (repeatable)")
+        report_parser.add_argument("--output-root", default=None,
+                                   help="write under this directory instead of OUTPUT_PATH")
+        report_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                                   help="worker processes (0 = all cores)")
+        report_parser.add_argument("--full", action="store_true",
+                                   help="rebuild every commander (no incremental build)")
+        report_parser.add_argument("--delta", action="store_true", default=DELTA_INGESTION,
+                                   help="take the stats from the delta ingestion state")
+        report_parser.add_argument("--zip", metavar="ARCHIVE", default=None,
+                                   help="write the reports into this zip archive")
+        report_parser.add_argument("--streaming", action="store_true", default=STREAMING_AGGREGATION,
+                                   help="bounded memory: stream the workbook instead of loading it")
+        report_parser.add_argument("--pipelined", action="store_true", default=PIPELINED_WRITES,
+                                   help="write the files from background threads while rendering continues")
+        report_parser.add_argument("--cohort-excel", action="store_true", default=COHORT_EXCEL_EXPORT,
+                                   help="one cohort workbook instead of a workbook per commander")
+        report_parser.set_defaults(handler=run_report_subcommand)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -9,10 +9,47 @@ INPUT_PATH = "answers.xlsx"
 
 TEMPLATE_PATH = "new_template2.docx"
 
+# Write the Word reports at the zip level: only the template parts holding placeholders or Jinja tags are
+# regenerated, every other member is copied compressed as is (False - python-docx rewrites the whole package)
+DOCX_PACKAGE_RENDERER = True
+
 OUTPUT_PATH = "output/"
 
+# Worker processes for report generation - 1 runs in the main process, None uses all cores
+DEFAULT_WORKERS = 1
+
+# The reports written for every commander - the Word report and the Excel workbook
+REPORT_FORMATS = ("docx", "excel")
+
+# Incremental builds - skip commanders whose reports are up to date according to the manifest
+INCREMENTAL_BUILD = True
+BUILD_MANIFEST_PATH = "output/.build_manifest.json"
+BUILD_MANIFEST_VERSION = 1
+
+# Delta ingestion - keep per-commander aggregates between runs and fold in only rows with a newer Timestamp
+DELTA_INGESTION = False
+AGGREGATE_STATE_PATH = "output/.aggregate_state.json"
+AGGREGATE_STATE_VERSION = 1
+
+# Streaming aggregation - read the workbook row by row into aggregates, spilling the rows to disk
+# whenever the rows held in memory pass the budget (bytes)
+STREAMING_AGGREGATION = False
+STREAMING_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Pipelined writes - render reports to bytes and write them from background threads
+PIPELINED_WRITES = False
+WRITER_THREADS = 2
+# Rendered files waiting to be written, at most - rendering waits when the writers fall behind
+WRITER_QUEUE_SIZE = 8
+
+# Opt-in instrumentation (see instrumentation.py) - set to a path to get a JSON run report / cProfile stats
+INSTRUMENTATION_ENV_VAR = "MASHOV_INSTRUMENT"
+PROFILE_ENV_VAR = "MASHOV_PROFILE"
+
 COMMANDER_COLUMN = "שם המפקד:"
 
+TIMESTAMP_COLUMN = "Timestamp"
+
 PLACEHOLDERS = [
 
                 "name", "number_answers",
@@ -35,7 +72,25 @@ PLACEHOLDERS = [
 
                 "average_general",
                  "std_general",
-                 "total_general"
+                 "total_general",
+
+                # cohort ranking (OPTIONS_TO_RANKING_PLACEHOLDERS, GENERAL_RANKING_PLACEHOLDERS)
+                "rank_command_1", "rank_command_2", "rank_command_3", "rank_command_4", "rank_command_5",
+                "rank_involvement_1", "rank_involvement_2", "rank_involvement_3", "rank_involvement_4", "rank_involvement_5",
+                "rank_personal_1", "rank_personal_2", "rank_personal_3", "rank_personal_4", "rank_personal_5",
+                "rank_challenge_1", "rank_challenge_2", "rank_challenge_3", "rank_challenge_4", "rank_challenge_5",
+
+                "percentile_command_1", "percentile_command_2", "percentile_command_3", "percentile_command_4", "percentile_command_5",
+                "percentile_involvement_1", "percentile_involvement_2", "percentile_involvement_3", "percentile_involvement_4", "percentile_involvement_5",
+                "percentile_personal_1", "percentile_personal_2", "percentile_personal_3", "percentile_personal_4", "percentile_personal_5",
+                "percentile_challenge_1", "percentile_challenge_2", "percentile_challenge_3", "percentile_challenge_4", "percentile_challenge_5",
+
+                "zscore_command_1", "zscore_command_2", "zscore_command_3", "zscore_command_4", "zscore_command_5",
+                "zscore_involvement_1", "zscore_involvement_2", "zscore_involvement_3", "zscore_involvement_4", "zscore_involvement_5",
+                "zscore_personal_1", "zscore_personal_2", "zscore_personal_3", "zscore_personal_4", "zscore_personal_5",
+                "zscore_challenge_1", "zscore_challenge_2", "zscore_challenge_3", "zscore_challenge_4", "zscore_challenge_5",
+
+                "rank_general", "percentile_general", "zscore_general"
 
                 ]
 
@@ -68,6 +123,16 @@ OPTIONS_TO_PLACEHOLDERS = {
                             "אף אחד מההיגדים אינו נכון בעיניי_3": ("percent_challenge_5", "total_challenge_5"),
                             }
 
+# Cohort ranking placeholders - the commander's standing among the cohort's commanders:
+# rank (1 = highest), percentile (share of the other commanders below, 0-100) and z-score,
+# per option (named after its percent_* placeholder) and for the general question average
+RANKING_PLACEHOLDER_PREFIXES = ("rank_", "percentile_", "zscore_")
+OPTIONS_TO_RANKING_PLACEHOLDERS = {
+    option_key: tuple(percent_ph.replace("percent_", prefix, 1) for prefix in RANKING_PLACEHOLDER_PREFIXES)
+    for option_key, (percent_ph, _) in OPTIONS_TO_PLACEHOLDERS.items()
+}
+GENERAL_RANKING_PLACEHOLDERS = ("rank_general", "percentile_general", "zscore_general")
+
 NONE_OF_THE_ABOVE_OPTION = "אף אחד מההיגדים אינו נכון בעיניי"
 
 MULTIPLE_CHOICE_COLUMNS = [
@@ -168,17 +233,27 @@ RLM = '\u200F'
 PUNCTUATION_CHARS = [
     ",", ".", "\"", "\\", "-", ":", ";", "(", ")", "!", "?", "+", "/"
 ]
+
+# Columns added by prepare_open_text() next to each open question
+CLEAN_TEXT_COLUMN_SUFFIX = " [clean]"
+RTL_TEXT_COLUMN_SUFFIX = " [rtl]"
 # ===== Excel export constants =====
 
 
 
 COMMANDER_EXCEL_OUTPUT_PATH = "output/excel/"
 
+# Write the commander workbooks row by row (openpyxl write-only) instead of through pandas DataFrames
+EXCEL_STREAMING_EXPORT = True
+
+# Folder of the commander workbooks inside a reports archive
+ARCHIVE_EXCEL_FOLDER = "excel/"
+
 SHEET_NAME_QUANTITATIVE = "Quantitative"
 SHEET_NAME_TEXTUAL = "Textual"
 
 OPTIONS_PER_QUESTION = 5
-OPTION_BLOCK_WIDTH = 3
+OPTION_BLOCK_WIDTH = 6
 
 
 QUANT_HEADER_LABEL_COMMANDER = "Commander"
@@ -186,6 +261,9 @@ QUANT_HEADER_LABEL_NUM_RESPONDENTS = "Number of respondents"
 QUANT_HEADER_LABEL_AVG_GENERAL = "General question – commander average"
 QUANT_HEADER_LABEL_STD_GENERAL = "General question – commander std"
 QUANT_HEADER_LABEL_COHORT_GENERAL = "General question – cohort average"
+QUANT_HEADER_LABEL_RANK_GENERAL = "General question – rank in cohort"
+QUANT_HEADER_LABEL_PERCENTILE_GENERAL = "General question – cohort percentile"
+QUANT_HEADER_LABEL_ZSCORE_GENERAL = "General question – cohort z-score"
 
 QUANT_HEADER_ROWS = [
     ("meta",        QUANT_HEADER_LABEL_COMMANDER,        "commander_name"),
@@ -193,6 +271,9 @@ QUANT_HEADER_ROWS = [
     ("placeholder", QUANT_HEADER_LABEL_AVG_GENERAL,      "average_general"),
     ("placeholder", QUANT_HEADER_LABEL_STD_GENERAL,      "std_general"),
     ("placeholder", QUANT_HEADER_LABEL_COHORT_GENERAL,   "total_general"),
+    ("placeholder", QUANT_HEADER_LABEL_RANK_GENERAL,     "rank_general"),
+    ("placeholder", QUANT_HEADER_LABEL_PERCENTILE_GENERAL, "percentile_general"),
+    ("placeholder", QUANT_HEADER_LABEL_ZSCORE_GENERAL,   "zscore_general"),
 ]
 
 
@@ -202,3 +283,49 @@ QUANT_COLUMN_QUESTION = "Question"
 QUANT_SUBHEADER_STATEMENT = "Statement"
 QUANT_SUBHEADER_COMMANDER_PERCENT = "Commander %"
 QUANT_SUBHEADER_COHORT_PERCENT = "Cohort %"
+QUANT_SUBHEADER_RANK = "Rank"
+QUANT_SUBHEADER_PERCENTILE = "Percentile"
+QUANT_SUBHEADER_ZSCORE = "Z-score"
+
+# Cohort workbook - every commander in one workbook, in long format, instead of a workbook per commander
+COHORT_EXCEL_EXPORT = False
+COHORT_EXCEL_FILENAME = "cohort.xlsx"
+
+COHORT_COLUMN_COMMANDER = "Commander"
+COHORT_COLUMN_OPTION = "Option"
+COHORT_COLUMN_ANSWER = "Answer"
+COHORT_OPTION_AVERAGE = "Average"
+COHORT_OPTION_STD = "Std"
+
+COHORT_QUANTITATIVE_HEADER = [COHORT_COLUMN_COMMANDER, QUANT_COLUMN_QUESTION, COHORT_COLUMN_OPTION,
+                              QUANT_SUBHEADER_COMMANDER_PERCENT, QUANT_SUBHEADER_COHORT_PERCENT,
+                              QUANT_SUBHEADER_RANK, QUANT_SUBHEADER_PERCENTILE, QUANT_SUBHEADER_ZSCORE]
+COHORT_TEXTUAL_HEADER = [COHORT_COLUMN_COMMANDER, QUANT_COLUMN_QUESTION, COHORT_COLUMN_ANSWER]
+
+
+# ===== Loading constants =====
+
+# pd.read_excel engine - None lets pandas choose (openpyxl for .xlsx), "calamine" is faster when installed
+EXCEL_ENGINE = None
+
+# Explicit dtypes for the text columns, so pandas does not infer them on every load
+COLUMN_DTYPES = {
+    column: str for column in COLUMNS
+    if column not in (TIMESTAMP_COLUMN, GENERAL_QUESTION_COLUMN)
+}
+
+# Parsed input cache - the cleaned answers frame, reused while the workbook's content and the schema are unchanged
+PARSED_CACHE = True
+PARSED_CACHE_DIR = "output/.cache/"
+# Bump when the cleaning in load_answers() changes, so older caches are not used
+PARSED_CACHE_VERSION = 1
+# "pickle" needs nothing extra, "feather" is memory-mapped on load (needs pyarrow)
+PARSED_CACHE_FORMAT = "pickle"
+
+
+# ===== Report service constants =====
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+# Loaded cohorts kept in memory, keyed by the answers workbook's content hash
+SERVICE_COHORT_CACHE_SIZE = 4
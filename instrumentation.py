@@ -0,0 +1,173 @@
+"""
+Opt-in instrumentation of report runs.
+
+Nothing is measured unless it is turned on, so the hooks in strol_code cost a flag check:
+    MASHOV_INSTRUMENT=<report.json>  times every stage (wall and CPU, per commander too), counts the work
+                                     done and writes a JSON run report when main() ends.
+    MASHOV_PROFILE=<run.prof>        also runs main() under cProfile and dumps the stats there.
+"""
+import contextlib
+import cProfile
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from constants import INSTRUMENTATION_ENV_VAR, PROFILE_ENV_VAR
+
+
+_state: Dict = {
+    "enabled": bool(os.environ.get(INSTRUMENTATION_ENV_VAR)),
+    "commander": None,
+}
+
+
+def new_metrics() -> Dict:
+    return {"stages": {}, "commanders": {}, "counters": {}, "artifacts": []}
+
+
+_metrics = new_metrics()
+
+
+def is_enabled() -> bool:
+    return _state["enabled"]
+
+
+def enable(enabled: bool = True):
+    _state["enabled"] = enabled
+
+
+def reset():
+    global _metrics
+    _metrics = new_metrics()
+    _state["commander"] = None
+
+
+def add_timing(timings: Dict, name: str, wall: float, cpu: float):
+    stats = timings.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+    stats["wall_s"] += wall
+    stats["cpu_s"] += cpu
+    stats["calls"] += 1
+
+
+@contextlib.contextmanager
+def stage(name: str, commander: Optional[str] = None):
+    """
+    Times the block as stage `name`. Blocks run for a commander are also kept under that commander,
+    together with every counter hit inside them.
+    """
+    if not _state["enabled"]:
+        yield
+        return
+
+    previous_commander = _state["commander"]
+    if commander is not None:
+        _state["commander"] = commander
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        add_timing(_metrics["stages"], name, wall, cpu)
+        current = _state["commander"]
+        if current is not None:
+            commander_metrics = _metrics["commanders"].setdefault(current, {"stages": {}, "counters": {}})
+            add_timing(commander_metrics["stages"], name, wall, cpu)
+        _state["commander"] = previous_commander
+
+
+def count(counter: str, amount: int = 1):
+    if not _state["enabled"]:
+        return
+
+    _metrics["counters"][counter] = _metrics["counters"].get(counter, 0) + amount
+    current = _state["commander"]
+    if current is not None:
+        counters = _metrics["commanders"].setdefault(current, {"stages": {}, "counters": {}})["counters"]
+        counters[counter] = counters.get(counter, 0) + amount
+
+
+def record_artifact(path: str, size: Optional[int] = None):
+    """
+    size - for artifacts that are not files (e.g. archive members); read from disk when missing.
+    """
+    if not _state["enabled"]:
+        return
+
+    if size is None:
+        size = os.path.getsize(path)
+    _metrics["artifacts"].append({"path": path, "bytes": size, "commander": _state["commander"]})
+    count("bytes_written", size)
+
+
+def snapshot() -> Dict:
+    return _metrics
+
+
+def merge(metrics: Dict):
+    """
+    Adds metrics collected in another process (see snapshot()) to this one.
+    """
+    for name, stats in metrics["stages"].items():
+        merge_timing(_metrics["stages"], name, stats)
+    for counter, value in metrics["counters"].items():
+        _metrics["counters"][counter] = _metrics["counters"].get(counter, 0) + value
+    for commander, commander_metrics in metrics["commanders"].items():
+        target = _metrics["commanders"].setdefault(commander, {"stages": {}, "counters": {}})
+        for name, stats in commander_metrics["stages"].items():
+            merge_timing(target["stages"], name, stats)
+        for counter, value in commander_metrics["counters"].items():
+            target["counters"][counter] = target["counters"].get(counter, 0) + value
+    _metrics["artifacts"].extend(metrics["artifacts"])
+
+
+def merge_timing(timings: Dict, name: str, stats: Dict):
+    target = timings.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+    for key in target:
+        target[key] += stats[key]
+
+
+def write_run_report(report_path: str, run_info: Dict):
+    report = {**run_info, **_metrics}
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Run report written to: {report_path}")
+
+
+@contextlib.contextmanager
+def instrumented_run(report_path: Optional[str] = None, profile_path: Optional[str] = None):
+    """
+    Wraps a whole run. The paths default to the MASHOV_INSTRUMENT / MASHOV_PROFILE environment variables;
+    without them the block just runs.
+    """
+    report_path = report_path or os.environ.get(INSTRUMENTATION_ENV_VAR)
+    profile_path = profile_path or os.environ.get(PROFILE_ENV_VAR)
+
+    if report_path:
+        enable()
+        reset()
+    profiler = cProfile.Profile() if profile_path else None
+
+    started_at = datetime.now().isoformat(timespec="seconds")
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            print(f"Profile written to: {profile_path}")
+        if report_path:
+            write_run_report(report_path, {
+                "started_at": started_at,
+                "wall_s": time.perf_counter() - wall_start,
+                "cpu_s": time.process_time() - cpu_start,
+                "pid": os.getpid(),
+            })
@@ -0,0 +1,241 @@
+"""
+Report service - a long-running local HTTP server for regenerating reports while they are reviewed.
+
+The imports, the constants and the compiled template are loaded once, and the last cohorts are kept
+in memory by the content hash of their answers workbook, so a repeated request only renders:
+
+    python service.py --port 8765 --workers 4
+
+    POST /reports?commander=<name>&format=docx       body: the answers workbook
+    GET  /reports?path=answers.xlsx&commander=<name>&format=xlsx
+    GET  /health
+
+format is docx (default), xlsx or zip for one commander; without a commander the whole cohort
+is returned as a zip archive. With --workers > 1 the reports are rendered in a process pool.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import urllib.parse
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import strol_code
+from constants import *
+
+
+CONTENT_TYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "zip": "application/zip",
+}
+
+# The reports rendered for each format - a single report renders only itself
+FORMAT_REPORTS = {
+    "docx": ("docx",),
+    "xlsx": ("excel",),
+    "zip": REPORT_FORMATS,
+}
+
+_cohorts: OrderedDict = OrderedDict()
+_cohorts_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def warm_up():
+    """
+    Pays the cold start once - in the server and in every worker process.
+    """
+    strol_code.compile_template(TEMPLATE_PATH)
+
+
+def get_cohort(answers: bytes) -> Optional[Dict]:
+    """
+    The prepared cohort (see strol_code.prepare_cohort()) of an answers workbook, cached by its content hash.
+    Returns None if the workbook failed validation.
+    """
+    key = hashlib.sha256(answers).hexdigest()
+    with _cohorts_lock:
+        if key in _cohorts:
+            _cohorts.move_to_end(key)
+            return _cohorts[key]
+
+    df = strol_code.load_answers(io.BytesIO(answers))
+    if df is None:
+        return None
+    cohort = strol_code.prepare_cohort(df)
+
+    with _cohorts_lock:
+        _cohorts[key] = cohort
+        while len(_cohorts) > SERVICE_COHORT_CACHE_SIZE:
+            _cohorts.popitem(last=False)
+    return cohort
+
+
+def render_commanders(cohort: Dict, commanders: list[str],
+                      formats=REPORT_FORMATS) -> Dict[str, Dict[str, bytes]]:
+    """
+    Returns commander -> archive member name -> bytes of the formats' reports, in the pool when there is one.
+    Commanders whose calculations validation failed are left out.
+    """
+    tasks = {
+        commander: [strol_code.render_commander_reports, cohort["partitions"][commander], commander,
+                    cohort["commander_counts"].get(commander), cohort["mahzor_averages"],
+                    cohort["general_stats"].get(commander), formats, cohort["rankings"].get(commander)]
+        for commander in commanders
+    }
+    if _executor is None:
+        results = {commander: task[0](*task[1:]) for commander, task in tasks.items()}
+    else:
+        futures = {commander: _executor.submit(*task) for commander, task in tasks.items()}
+        results = {commander: future.result() for commander, future in futures.items()}
+    return {commander: artifacts for commander, artifacts in results.items() if artifacts is not None}
+
+
+def build_response(cohort: Dict, commander: Optional[str], report_format: str) -> tuple[str, bytes]:
+    """
+    Returns (file name, content) of the requested report.
+    """
+    if commander is None:
+        commanders = list(cohort["partitions"])
+        file_name = "reports.zip"
+    else:
+        commanders = [commander]
+        file_name = f"{commander}.{report_format}"
+
+    formats = FORMAT_REPORTS[report_format]
+    rendered = render_commanders(cohort, commanders, formats)
+    if commander is not None and report_format != "zip":
+        if commander not in rendered:
+            raise ValueError(f"Calculations validation failed for commander {commander}")
+        members = strol_code.get_archive_members(commander)
+        return file_name, rendered[commander][members[formats[0]]]
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for artifacts in rendered.values():
+            strol_code.write_to_archive(archive, artifacts)
+    return file_name, buffer.getvalue()
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/health":
+            self.send_json(200, {"status": "ok", "cohorts_cached": len(_cohorts)})
+        elif url.path == "/reports":
+            self.handle_reports(url, None)
+        else:
+            self.send_json(404, {"error": f"Unknown path {url.path}"})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != "/reports":
+            self.send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            self.send_json(400, {"error": f"Invalid Content-Length {self.headers.get('Content-Length')}"})
+            return
+        self.handle_reports(url, self.rfile.read(length) if length else None)
+
+    def handle_reports(self, url: urllib.parse.SplitResult, answers: Optional[bytes]):
+        params = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+        commander = params.get("commander")
+        report_format = params.get("format", "docx" if commander else "zip")
+
+        if report_format not in CONTENT_TYPES or (commander is None and report_format != "zip"):
+            self.send_json(400, {"error": f"Unsupported format {report_format}"})
+            return
+        if answers is None:
+            path = params.get("path")
+            if path is None:
+                self.send_json(400, {"error": "Send the answers workbook as the body or pass ?path="})
+                return
+            if not os.path.isfile(path):
+                self.send_json(404, {"error": f"No answers workbook at {path}"})
+                return
+
+        try:
+            if answers is None:
+                with open(path, "rb") as f:
+                    answers = f.read()
+            cohort = get_cohort(answers)
+        except Exception as e:
+            # e.g. a body that is not an xlsx workbook
+            self.send_json(400, {"error": f"Could not read the answers workbook: {e}"})
+            return
+        if cohort is None:
+            self.send_json(400, {"error": "The answers workbook failed validation"})
+            return
+        if commander is not None and commander not in cohort["partitions"]:
+            self.send_json(404, {"error": f"No answers for commander {commander}"})
+            return
+
+        try:
+            file_name, content = build_response(cohort, commander, report_format)
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[report_format])
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Content-Disposition",
+                         f"attachment; filename*=UTF-8''{urllib.parse.quote(file_name)}")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_json(self, status: int, body: Dict):
+        content = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT, workers: Optional[int] = DEFAULT_WORKERS):
+    """
+    Serves until interrupted. workers > 1 (or None for all cores) renders in a warm process pool,
+    otherwise in the request's thread.
+    """
+    global _executor
+    warm_up()
+    if workers is None or workers > 1:
+        _executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+
+    server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+    print(f"Report service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if _executor is not None:
+            _executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve commander reports over local HTTP.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="worker processes for rendering (0 = all cores)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers or None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,43 @@
+from __future__ import annotations
+
 import pandas as pd
-import docx
+import numpy as np
 import re
-from docx import Document
-import docx.table
-import docx.text.paragraph
-from docx.shared import Inches, Pt, RGBColor
-from typing import Dict, Union
-from docxtpl import DocxTemplate
+import copy
+import functools
+from typing import Callable, Dict, Union, TYPE_CHECKING
 import os
+import io
+import zipfile
+import zlib
+import struct
+import json
+import hashlib
+import math
+import pickle
+import sys
+import tempfile
+import threading
+import queue
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from itertools import zip_longest
 from typing import Optional
 
 from constants import *
+import constants
+import instrumentation
+
+# The Word stack (python-docx, docxtpl and Jinja2) is imported only by the functions that render documents,
+# so validation, stats and Excel-only runs start without it
+if TYPE_CHECKING:
+    import docx.table
+    import docx.text.paragraph
+    from docx.document import Document
+    from docxtpl import DocxTemplate
 
 
 
@@ -18,27 +45,152 @@ from constants import *
 
 def validate_excel(file_path=INPUT_PATH) -> bool:
     try:
-        df = excel_to_dataframe(file_path)
+        actual_columns, has_data = read_excel_header(file_path)
     except Exception as e:
         print(f"❌ Error reading Excel file: {e}")
         return False
 
-    actual_columns = list(df.columns)
     column_match = set(actual_columns) == set(COLUMNS)
 
     if not column_match:
         print(f"❌ Column names do not match expected names.\nExpected: {COLUMNS}\nActual: {actual_columns}")
         return False
 
-    if df.empty:
+    if not has_data:
         print("❌ Excel file is empty.")
         return False
     return True
 
 
+def read_excel_header(file_path=INPUT_PATH) -> tuple[list, bool]:
+    """
+    Reads the header row of the first sheet in a streaming read-only pass.
+    Returns (column names, whether the sheet has any data row after the header).
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        # stops at the first non-empty row
+        has_data = any(any(cell is not None for cell in row) for row in rows)
+    finally:
+        workbook.close()
+
+    while header and header[-1] is None:
+        header.pop()
+
+    return header, has_data
 
-def excel_to_dataframe(file_path=INPUT_PATH):
-    return pd.read_excel(file_path)
+
+def excel_to_dataframe(file_path=INPUT_PATH, engine: Optional[str] = EXCEL_ENGINE,
+                       dtype: Optional[Dict] = None):
+    if dtype is None:
+        dtype = COLUMN_DTYPES
+    return pd.read_excel(file_path, engine=engine, dtype=dtype)
+
+
+def load_answers(file_path=INPUT_PATH, engine: Optional[str] = EXCEL_ENGINE,
+                 cache_dir: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Validates the header, then loads the sheet once and drops rows without a commander.
+    cache_dir - keep the cleaned frame there and load it instead of the workbook while the file is unchanged.
+    Returns None if validation fails.
+    """
+    cache_path = None
+    if cache_dir is not None and isinstance(file_path, (str, os.PathLike)):
+        with instrumentation.stage("load_parsed_cache"):
+            cache_path = get_parsed_cache_path(file_path, cache_dir)
+            df = load_parsed_cache(cache_path)
+        if df is not None:
+            instrumentation.count("rows_loaded_from_cache", len(df))
+            return df
+
+    with instrumentation.stage("validate_excel"):
+        if not validate_excel(file_path):
+            print("Excel file validation failed.")
+            return None
+
+    with instrumentation.stage("excel_to_dataframe"):
+        df = excel_to_dataframe(file_path, engine=engine)
+    instrumentation.count("rows_loaded", len(df))
+    # clen up empty rows / rows without commander name
+    df = df.dropna(how="all")
+    df = df.dropna(subset=[COMMANDER_COLUMN])
+    # the general question is converted once, every later stat works on the numbers
+    df[GENERAL_QUESTION_COLUMN] = general_answers_to_numeric(df[GENERAL_QUESTION_COLUMN])
+    df[COMMANDER_COLUMN] = df[COMMANDER_COLUMN].astype("category")
+
+    if cache_path is not None:
+        with instrumentation.stage("save_parsed_cache"):
+            save_parsed_cache(df, cache_path)
+    return df
+
+
+# ==== Parsed input cache
+def get_parsed_cache_path(file_path, cache_dir=PARSED_CACHE_DIR) -> str:
+    """
+    The cache file of the workbook's current content. The name holds a hash of the content and of the
+    schema (COLUMNS, COLUMN_DTYPES, EXCEL_ENGINE, PARSED_CACHE_VERSION), so changing either misses the cache.
+    It starts with the workbook's name and a hash of its absolute path, which tell the workbook's caches apart
+    from those of other workbooks (see save_parsed_cache()).
+    """
+    schema = json.dumps([PARSED_CACHE_VERSION, COLUMNS, str(COLUMN_DTYPES), EXCEL_ENGINE], ensure_ascii=False)
+    digest = hashlib.sha256(schema.encode())
+    digest.update(hash_file(file_path).encode())
+
+    source_name = os.path.splitext(os.path.basename(file_path))[0]
+    source_hash = hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{source_name}-{source_hash}-{digest.hexdigest()[:16]}.{PARSED_CACHE_FORMAT}")
+
+
+def load_parsed_cache(cache_path: str) -> Optional[pd.DataFrame]:
+    """
+    The "feather" format needs pyarrow (optional, not in requirements.txt) and is read memory-mapped.
+    """
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        if PARSED_CACHE_FORMAT == "feather":
+            from pyarrow import feather
+            table = feather.read_table(cache_path, memory_map=True)
+            return table.to_pandas().set_index("index").rename_axis(None)
+        return pd.read_pickle(cache_path)
+    except Exception as e:
+        # e.g. written by another pandas version - parse the workbook again
+        print(f"Ignoring unreadable input cache {cache_path}: {e}")
+        return None
+
+
+def save_parsed_cache(df: pd.DataFrame, cache_path: str):
+    """
+    A cache that cannot be written is reported and skipped, like one that cannot be read - the run goes on
+    with the parsed frame, and the workbook's older caches are kept.
+    """
+    cache_dir, cache_name = os.path.split(cache_path)
+
+    # written aside and renamed, so a concurrent run never reads half a cache
+    temp_path = cache_path + ".tmp"
+    try:
+        os.makedirs(cache_dir or ".", exist_ok=True)
+        if PARSED_CACHE_FORMAT == "feather":
+            df.reset_index(names="index").to_feather(temp_path)
+        else:
+            df.to_pickle(temp_path)
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        # e.g. the feather format without pyarrow, or a read-only folder
+        print(f"Not saving input cache {cache_path}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return
+
+    # caches of older versions of the same workbook (same name and path, any content hash) are stale now
+    source_key = cache_name.rsplit("-", 1)[0]
+    stale_pattern = re.compile(re.escape(source_key) + r"-[0-9a-f]{16}\.\w+")
+    for stale_name in os.listdir(cache_dir or "."):
+        if stale_name != cache_name and stale_pattern.fullmatch(stale_name):
+            os.remove(os.path.join(cache_dir, stale_name))
 
 def format_number(x: float):
     """
@@ -62,17 +214,37 @@ def compute_percent(count: int, total: int) -> float:
     form_value = format_number(value)
     return f"{form_value}%"
 
+def general_answers_to_numeric(raw: pd.Series) -> pd.Series:
+    """
+    Converts the general question answers to floats; empty/whitespace and invalid answers become NaN.
+    load_answers() already does this once, so a numeric column is returned as is.
+    """
+    if pd.api.types.is_numeric_dtype(raw):
+        return raw.astype(float)
+    cleaned = raw.replace(r'^\s*$', pd.NA, regex=True)
+    return pd.to_numeric(cleaned, errors="coerce").astype(float)
+
+
+def group_general_moments(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One grouped pass over the general question: count, sum and sum of squares of the valid answers per commander.
+    """
+    general = general_answers_to_numeric(df[GENERAL_QUESTION_COLUMN])
+    valid = general.notna()
+    moments = pd.DataFrame({
+        "count": valid.astype(int),
+        "sum": general.where(valid, 0.0),
+        "sum_sq": (general * general).where(valid, 0.0),
+    })
+    return moments.groupby(df[COMMANDER_COLUMN], sort=False, observed=True).sum()
+
+
 def compute_mahzor_general_average(df: pd.DataFrame) -> float:
     """
     Computes the overall (mahzor) average of:
         'עד כמה הייתי רוצה להיות תחת פיקודו בעתיד?'
     """
-    col = GENERAL_QUESTION_COLUMN
-
-    raw = df[col]
-    cleaned = raw.replace(r'^\s*$', pd.NA, regex=True)
-    numeric = pd.to_numeric(cleaned, errors="coerce")
-    series = numeric.dropna()
+    series = general_answers_to_numeric(df[GENERAL_QUESTION_COLUMN]).dropna()
 
     if series.empty:
         return DEFAULT_ZERO_VALUE
@@ -84,16 +256,8 @@ def compute_commander_general_stats(df_commander: pd.DataFrame) -> Dict:
     Computes per-commander stats for:
         'עד כמה הייתי רוצה להיות תחת פיקודו בעתיד?'
     """
-    col = GENERAL_QUESTION_COLUMN
-
-    raw = df_commander[col]
-
-    # Treat empty/whitespace as missing
-    cleaned = raw.replace(r'^\s*$', pd.NA, regex=True)
-
-    # Convert to numeric, invalid -> NaN, then drop NaN
-    numeric = pd.to_numeric(cleaned, errors="coerce")
-    series = numeric.dropna()
+    # Empty/whitespace and invalid answers are missing
+    series = general_answers_to_numeric(df_commander[GENERAL_QUESTION_COLUMN]).dropna()
 
     n_valid = len(series)
 
@@ -126,51 +290,354 @@ def add_general_question_mahzor(df_all: pd.DataFrame,
     mahzor_avg = compute_mahzor_general_average(df_all)
     mahzor_averages["total_general"] = mahzor_avg
 
-def calculations_on_seperated_data(df_commander: pd.DataFrame, commander):
+def general_stats_from_moments(count: int, total: float, total_sq: float) -> Dict:
+    """
+    Same result as compute_commander_general_stats, from the count, sum and sum of squares
+    of the commander's valid answers.
+    """
+    stats = {}
+    if count < MIN_GENERAL_ANSWERS:
+        stats["average_general"] = TOO_FEW_ANSWERS_TEXT
+        stats["std_general"] = TOO_FEW_ANSWERS_TEXT
+        return stats
+
+    mean_val = total / count
+    variance = max(total_sq - count * mean_val * mean_val, 0.0) / (count - 1) if count > 1 else 0.0
+
+    stats["average_general"] = round(float(mean_val), 2)
+    stats["std_general"] = round(math.sqrt(variance), 2)
+
+    return stats
+
+
+def calculations_on_seperated_data(df_commander: pd.DataFrame, commander,
+                                   option_counts: Optional[pd.Series] = None,
+                                   general_stats: Optional[Dict] = None):
+    """
+    option_counts - the commander's row of tally_options(); computed from df_commander when missing.
+    Counts taken from an aggregate carry its respondents in attrs (see commander_stats_from_aggregate()),
+    which are then the percentages' denominator - the delta state may not cover every row of df_commander.
+    general_stats - precomputed average_general/std_general; computed from df_commander when missing.
+    """
     placeholder_to_value = {}
-    for option in OPTIONS:
-        if option != NONE_OF_THE_ABOVE_OPTION:
-            count = count_occurrences(df_commander, option)
-            percent_ph, _ = OPTIONS_TO_PLACEHOLDERS[option]  # split the tuple
-            placeholder_to_value[percent_ph] = compute_percent(count, len(df_commander))
-    # I handle it differently as it appears in all of the questions
-    handle_none_of_the_above(df_commander, placeholder_to_value)
+    if option_counts is None:
+        option_counts = build_option_indicator_matrix(df_commander).sum()
+    respondents = option_counts.attrs.get("respondents", len(df_commander))
+
+    for option_key, (percent_ph, _) in OPTIONS_TO_PLACEHOLDERS.items():
+        placeholder_to_value[percent_ph] = compute_percent(int(option_counts[option_key]), respondents)
 
     for column in OPEN_QUESTIONS_COLUMNS:
         placeholder_to_value[column] = [str(item) for item in df_commander[column].dropna().tolist()]
 
-    add_general_question_commander(df_commander, placeholder_to_value)
+    if general_stats is None:
+        add_general_question_commander(df_commander, placeholder_to_value)
+    else:
+        placeholder_to_value.update(general_stats)
 
     return placeholder_to_value
 
 
-def handle_none_of_the_above(df_filtered: pd.DataFrame, placeholder_to_value: Dict):
-    for index, col in enumerate(MULTIPLE_CHOICE_COLUMNS):
-        count = count_occurrences(df_filtered[col], NONE_OF_THE_ABOVE_OPTION)
-        percent_ph, _ = OPTIONS_TO_PLACEHOLDERS[NONE_OF_THE_ABOVE_OPTION + f"_{index}"]
-        placeholder_to_value[percent_ph] = compute_percent(count,len(df_filtered))
+def calculate_total_percentage(df: pd.DataFrame, option_counts: Optional[pd.Series] = None):
+    """
+    option_counts - the cohort totals of tally_options(); computed from df when missing.
+    """
+    mahzor_averages = {}
+    if option_counts is None:
+        option_counts = build_option_indicator_matrix(df).sum()
+
+    for option_key, (_, total_ph) in OPTIONS_TO_PLACEHOLDERS.items():
+        mahzor_averages[total_ph] = compute_percent(int(option_counts[option_key]), len(df))
+
+    add_general_question_mahzor(df,mahzor_averages)
+    return mahzor_averages
 
 
+# ==== Option tally
+def get_option_key(question_index: int, option: str) -> str:
+    """
+    Returns the OPTIONS_TO_PLACEHOLDERS key of an option.
+    "None of the above" appears in every question, so its key carries the question index.
+    """
+    if option == NONE_OF_THE_ABOVE_OPTION:
+        return f"{NONE_OF_THE_ABOVE_OPTION}_{question_index}"
+    return option
 
-def calculate_total_percentage(df: pd.DataFrame):
-    mahzor_averages = {}
 
-    for option in OPTIONS:
-        if option != NONE_OF_THE_ABOVE_OPTION:
-            _, total_ph = OPTIONS_TO_PLACEHOLDERS[option]  # split the tuple
-            count = count_occurrences(df, option)
-            mahzor_averages[total_ph] = compute_percent(count,len(df))
+CHOICE_SEPARATOR = ","
+# Free text "other" answers make the distinct cell strings unbounded, and the report service lives long
+CHOICE_ANSWER_CACHE_SIZE = 65536
 
-    # "none of the above" per question
-    for index, col in enumerate(MULTIPLE_CHOICE_COLUMNS):
-        _, total_ph = OPTIONS_TO_PLACEHOLDERS[NONE_OF_THE_ABOVE_OPTION + f"_{index}"]
-        count = count_occurrences(df[col], NONE_OF_THE_ABOVE_OPTION)
-        mahzor_averages[total_ph] = compute_percent(count,len(df))
 
-    add_general_question_mahzor(df,mahzor_averages)
+@functools.lru_cache(maxsize=CHOICE_ANSWER_CACHE_SIZE)
+def parse_choice_answer(question: str, text: str) -> frozenset[int]:
+    """
+    Resolves a multiple choice cell into the offsets (in QUESTION_TO_OPTIONS[question]) of the options it contains.
+    Options are matched longest first at every position, so an option that contains a comma,
+    or whose text is part of a longer option, is counted once.
+    Cached - the last CHOICE_ANSWER_CACHE_SIZE distinct cell strings are parsed once.
+    """
+    instrumentation.count("choice_answers_parsed")
+    options = QUESTION_TO_OPTIONS[question]
+    by_length = sorted(range(len(options)), key=lambda offset: len(options[offset]), reverse=True)
+
+    text = text.strip()
+    found = set()
+    pos = 0
+    while pos < len(text):
+        for option_offset in by_length:
+            option = options[option_offset]
+            if text.startswith(option, pos):
+                found.add(option_offset)
+                pos += len(option)
+                break
+        else:
+            # unknown text - skip to the next answer
+            next_separator = text.find(CHOICE_SEPARATOR, pos)
+            pos = len(text) if next_separator == -1 else next_separator
+
+        while pos < len(text) and (text[pos] == CHOICE_SEPARATOR or text[pos].isspace()):
+            pos += 1
+
+    return frozenset(found)
+
+
+def build_option_indicator_matrix(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds a respondent x option boolean matrix of the multiple choice answers.
+    Every distinct cell string is parsed once (parse_choice_answer) and rows only look up their string.
+    Rows follow df.index, columns are the OPTIONS_TO_PLACEHOLDERS keys.
+    """
+    option_keys: list[str] = []
+    blocks: list[np.ndarray] = []
+    instrumentation.count("rows_scanned", len(df))
+
+    for question_index, question in enumerate(MULTIPLE_CHOICE_COLUMNS):
+        options = QUESTION_TO_OPTIONS[question]
+
+        if question in df.columns:
+            codes, distinct_answers = pd.factorize(df[question])
+            instrumentation.count("choice_cells_inspected", len(codes))
+            # last row stays empty, for missing cells (code -1)
+            distinct_block = np.zeros((len(distinct_answers) + 1, len(options)), dtype=bool)
+            for answer_index, answer in enumerate(distinct_answers):
+                if isinstance(answer, str):
+                    distinct_block[answer_index, list(parse_choice_answer(question, answer))] = True
+            block = distinct_block[codes]
+        else:
+            block = np.zeros((len(df), len(options)), dtype=bool)
+
+        blocks.append(block)
+        option_keys.extend(get_option_key(question_index, option) for option in options)
+
+    return pd.DataFrame(np.hstack(blocks), index=df.index, columns=option_keys)
+
+
+def tally_options(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Counts every option for all commanders with one grouped sum.
+    Returns (commander x option counts, cohort counts per option).
+    """
+    indicators = build_option_indicator_matrix(df)
+    commander_counts = indicators.groupby(df[COMMANDER_COLUMN], sort=False, observed=True).sum()
+    cohort_counts = indicators.sum()
+    return commander_counts, cohort_counts
+
+
+# ==== Aggregates
+def new_aggregate() -> Dict:
+    """
+    A mergeable record of everything the stats are made of: option counts, respondents
+    and the count, sum and sum of squares of the general question's valid answers.
+    """
+    return {
+        "respondents": 0,
+        "option_counts": {option_key: 0 for option_key in OPTIONS_TO_PLACEHOLDERS},
+        "general_count": 0,
+        "general_sum": 0.0,
+        "general_sum_sq": 0.0,
+    }
+
+
+def merge_aggregates(target: Dict, other: Dict) -> Dict:
+    """
+    Adds other into target and returns target. Merging is exact and order independent.
+    """
+    target["respondents"] += other["respondents"]
+    for option_key, count in other["option_counts"].items():
+        target["option_counts"][option_key] = target["option_counts"].get(option_key, 0) + count
+    target["general_count"] += other["general_count"]
+    target["general_sum"] += other["general_sum"]
+    target["general_sum_sq"] += other["general_sum_sq"]
+    return target
+
+
+def merge_commander_aggregates(target: Dict[str, Dict], other: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Merges per-commander aggregates of another shard (file, worker, delta) into target.
+    """
+    for commander, aggregate in other.items():
+        merge_aggregates(target.setdefault(commander, new_aggregate()), aggregate)
+    return target
+
+
+def combine_aggregates(aggregates) -> Dict:
+    combined = new_aggregate()
+    for aggregate in aggregates:
+        merge_aggregates(combined, aggregate)
+    return combined
+
+
+def build_commander_aggregates(df: pd.DataFrame) -> Dict[str, Dict]:
+    """
+    Builds every commander's aggregate in one grouped pass over df.
+    """
+    if df.empty:
+        return {}
+
+    commander_counts, _ = tally_options(df)
+    commanders = df[COMMANDER_COLUMN]
+    respondents = commanders.groupby(commanders, sort=False, observed=True).size()
+    general_moments = group_general_moments(df)
+
+    aggregates: Dict[str, Dict] = {}
+    for commander, num_rows in respondents.items():
+        aggregates[commander] = {
+            "respondents": int(num_rows),
+            "option_counts": {option_key: int(count)
+                              for option_key, count in commander_counts.loc[commander].items()},
+            "general_count": int(general_moments.loc[commander, "count"]),
+            "general_sum": float(general_moments.loc[commander, "sum"]),
+            "general_sum_sq": float(general_moments.loc[commander, "sum_sq"]),
+        }
+    return aggregates
+
+
+def commander_stats_from_aggregate(aggregate: Dict) -> tuple[pd.Series, Dict]:
+    """
+    Returns (option counts, general question stats) of one commander's aggregate.
+    The counts keep the aggregate's respondents in attrs, as the denominator of their percentages.
+    """
+    option_counts = pd.Series(aggregate["option_counts"])
+    option_counts.attrs["respondents"] = aggregate["respondents"]
+    general_stats = general_stats_from_moments(aggregate["general_count"],
+                                               aggregate["general_sum"],
+                                               aggregate["general_sum_sq"])
+    return option_counts, general_stats
+
+
+def cohort_averages_from_aggregate(aggregate: Dict) -> Dict:
+    """
+    calculate_total_percentage() from the cohort's merged aggregate instead of the rows.
+    """
+    mahzor_averages = {}
+    for option_key, (_, total_ph) in OPTIONS_TO_PLACEHOLDERS.items():
+        mahzor_averages[total_ph] = compute_percent(aggregate["option_counts"][option_key],
+                                                    aggregate["respondents"])
+
+    if aggregate["general_count"] == 0:
+        mahzor_averages["total_general"] = DEFAULT_ZERO_VALUE
+    else:
+        mahzor_averages["total_general"] = round(aggregate["general_sum"] / aggregate["general_count"], 2)
     return mahzor_averages
 
 
+# ==== Cohort ranking
+def build_cohort_matrix(commander_aggregates: Dict[str, Dict]) -> Dict:
+    """
+    The cohort statistics matrix, shared by all the commanders' rankings: one row per commander,
+    one column per OPTIONS_TO_PLACEHOLDERS option (the share of respondents who picked it)
+    and a last column with the general question average (NaN below MIN_GENERAL_ANSWERS).
+    """
+    commanders = list(commander_aggregates)
+    option_keys = list(OPTIONS_TO_PLACEHOLDERS)
+    aggregates = list(commander_aggregates.values())
+
+    option_counts = np.array([[aggregate["option_counts"].get(option_key, 0) for option_key in option_keys]
+                              for aggregate in aggregates], dtype=float).reshape(len(aggregates), len(option_keys))
+    respondents = np.array([aggregate["respondents"] for aggregate in aggregates], dtype=float)
+    general_count = np.array([aggregate["general_count"] for aggregate in aggregates], dtype=float)
+    general_sum = np.array([aggregate["general_sum"] for aggregate in aggregates], dtype=float)
+
+    shares = option_counts / np.maximum(respondents, 1)[:, None]
+    general_mean = np.where(general_count >= MIN_GENERAL_ANSWERS,
+                            general_sum / np.maximum(general_count, 1), np.nan)
+
+    return {
+        "commanders": commanders,
+        "values": np.column_stack([shares, general_mean]),
+    }
+
+
+def rank_cohort_matrix(values: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Ranks every column of the matrix, each with one sort: rank (1 = highest, ties share the best rank),
+    percentile (share of the column's other commanders with a lower value, 0-100) and z-score.
+    NaN cells are left out of their column and stay NaN.
+    """
+    ranks = np.full(values.shape, np.nan)
+    percentiles = np.full(values.shape, np.nan)
+    zscores = np.full(values.shape, np.nan)
+
+    for column in range(values.shape[1]):
+        valid = ~np.isnan(values[:, column])
+        column_values = values[valid, column]
+        if column_values.size == 0:
+            continue
+
+        ordered = np.sort(column_values)
+        below = np.searchsorted(ordered, column_values, side="left")
+        above = column_values.size - np.searchsorted(ordered, column_values, side="right")
+        others = column_values.size - 1
+        std = column_values.std()
+
+        ranks[valid, column] = above + 1
+        percentiles[valid, column] = 100.0 * below / others if others else 100.0
+        zscores[valid, column] = (column_values - column_values.mean()) / std if std > 0 else 0.0
+
+    return ranks, percentiles, zscores
+
+
+def compute_cohort_rankings(commander_aggregates: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Returns commander -> ranking placeholders (OPTIONS_TO_RANKING_PLACEHOLDERS and GENERAL_RANKING_PLACEHOLDERS),
+    all computed at once from the cohort matrix. Commanders with too few general answers are not ranked on it.
+    """
+    matrix = build_cohort_matrix(commander_aggregates)
+    ranks, percentiles, zscores = rank_cohort_matrix(matrix["values"])
+    placeholder_columns = [OPTIONS_TO_RANKING_PLACEHOLDERS[option_key] for option_key in OPTIONS_TO_PLACEHOLDERS]
+    placeholder_columns.append(GENERAL_RANKING_PLACEHOLDERS)
+
+    rankings: Dict[str, Dict] = {}
+    for row, commander in enumerate(matrix["commanders"]):
+        values = {}
+        for column, (rank_ph, percentile_ph, zscore_ph) in enumerate(placeholder_columns):
+            if np.isnan(ranks[row, column]):
+                values[rank_ph] = values[percentile_ph] = values[zscore_ph] = TOO_FEW_ANSWERS_TEXT
+                continue
+            values[rank_ph] = int(ranks[row, column])
+            values[percentile_ph] = format_number(percentiles[row, column])
+            values[zscore_ph] = round(float(zscores[row, column]), 2)
+        rankings[commander] = values
+    return rankings
+
+
+def partition_by_commander(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Splits the responses by commander in one pass.
+    Rows are stably sorted by commander once, so every partition is a contiguous
+    slice of the sorted frame. Commanders keep the order of their first appearance.
+    """
+    codes, commanders = pd.factorize(df[COMMANDER_COLUMN])
+    order = np.argsort(codes, kind="stable")
+    df_sorted = df.iloc[order]
+    bounds = np.searchsorted(codes[order], np.arange(len(commanders) + 1))
+
+    return {
+        commander: df_sorted.iloc[bounds[i]:bounds[i + 1]]
+        for i, commander in enumerate(commanders)
+    }
+
 
 def count_occurrences(data: Union[pd.DataFrame, pd.Series], target: str) -> int:
 
@@ -202,20 +669,43 @@ def validate_calculations(placeholder_to_value: Dict):
     return True
 
 
-def generate_and_fill_commander_docx(df, placeholder_to_value, commander, template_path=TEMPLATE_PATH,
+def generate_and_fill_commander_docx(df_commander, placeholder_to_value, commander, template_path=TEMPLATE_PATH,
                                      output_path=OUTPUT_PATH):
-    # First use python docx to replace placeholders and save
-    doc = Document(template_path)
+    doc = render_commander_docx(df_commander, placeholder_to_value, commander, template_path)
+    save_commander_docx(doc, output_path + commander + ".docx", template_path)
+    instrumentation.record_artifact(output_path + commander + ".docx")
 
-    replace_placeholders(doc, placeholder_to_value)
 
-    doc.save(output_path + commander + ".docx")
+def render_commander_docx_bytes(df_commander: pd.DataFrame, placeholder_to_value: Dict, commander: str,
+                                template_path=TEMPLATE_PATH) -> bytes:
+    buffer = io.BytesIO()
+    doc = render_commander_docx(df_commander, placeholder_to_value, commander, template_path)
+    save_commander_docx(doc, buffer, template_path)
+    return buffer.getvalue()
 
-    # : Use DocxTemplate (another library) to open the processed file and add bullet lists
-    add_bullet_lists(DocxTemplate(output_path + commander + ".docx"), df[df[COMMANDER_COLUMN] == commander], commander)
+
+def render_commander_docx(df_commander: pd.DataFrame, placeholder_to_value: Dict, commander: str,
+                          template_path=TEMPLATE_PATH) -> DocxTemplate:
+    """
+    Fills the scalar placeholders and renders the bullet lists on one in-memory document.
+    Nothing is written to disk - the caller saves the result once.
+    """
+    from docxtpl import DocxTemplate
+
+    # First use python docx to replace placeholders
+    doc = DocxTemplate(template_path)
+    doc.docx = render_compiled_template(compile_template(template_path), placeholder_to_value)
+
+    # : Then DocxTemplate renders the bullet lists on the same document
+    add_bullet_lists(doc, df_commander, commander)
+    return doc
 
 
-def replace_placeholders_in_paragraph(paragraph: docx.text.paragraph.Paragraph, values: Dict):
+def replace_placeholders_in_paragraph(paragraph: docx.text.paragraph.Paragraph, values: Dict,
+                                      placeholders: Optional[list[str]] = None):
+    """
+    placeholders - the placeholder names known to be in the paragraph; all of values is tried when missing.
+    """
     text_runs = [run for run in paragraph.runs if run.text]
 
     if not text_runs:
@@ -227,10 +717,16 @@ def replace_placeholders_in_paragraph(paragraph: docx.text.paragraph.Paragraph,
     if "{{" not in big_text:
         return
 
-    for placeholder, value in values.items():
+    if placeholders is None:
+        placeholders = values.keys()
+
+    for placeholder in placeholders:
+        if placeholder not in values:
+            continue
         token = "{{" + str(placeholder) + "}}"
         if token in big_text:
-            big_text = big_text.replace(token, str(value))
+            instrumentation.count("placeholders_replaced", big_text.count(token))
+            big_text = big_text.replace(token, str(values[placeholder]))
 
     pos = 0
     for run, old_text in zip(text_runs, original_texts):
@@ -239,8 +735,6 @@ def replace_placeholders_in_paragraph(paragraph: docx.text.paragraph.Paragraph,
         pos += length
 
 
-
-
 def replace_placeholders_in_table(table: docx.table.Table, values: Dict):
     for row in table.rows:
         for cell in row.cells:
@@ -275,6 +769,230 @@ def replace_placeholders(doc: Document, values: Dict):
         replace_placeholders_in_section(section, values)
 
 
+# ==== Package writer
+ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+ZIP_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+ZIP_END_RECORD = struct.Struct("<4s4H2LH")
+ZIP_UTF8_FLAG = 0x800
+XML_TAG_PATTERN = re.compile(rb"<[^>]*>")
+# {{ placeholders, {% Jinja blocks and {# comments, once the XML tags between runs are removed
+TEMPLATE_TAG_PATTERN = re.compile(rb"\{[{%#]")
+RELATIONSHIP_ID_PATTERN = re.compile(rb'<Relationship\b[^>]*\bId="([^"]*)"')
+PACKAGE_RELS_MEMBER = "_rels/.rels"
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template_package(template_path=TEMPLATE_PATH) -> list[Dict]:
+    """
+    Reads the template's zip members once: their compressed bytes as stored, whether the member
+    is an XML part holding placeholders or Jinja tags, i.e. one that changes per report,
+    and for the *.rels members the relationship ids they hold.
+    """
+    with open(template_path, "rb") as f:
+        package = f.read()
+
+    members = []
+    with zipfile.ZipFile(io.BytesIO(package)) as archive:
+        for info in archive.infolist():
+            name_length, extra_length = struct.unpack_from("<2H", package, info.header_offset + 26)
+            data_start = info.header_offset + ZIP_LOCAL_HEADER.size + name_length + extra_length
+            dynamic = (info.filename.endswith(".xml")
+                       and TEMPLATE_TAG_PATTERN.search(XML_TAG_PATTERN.sub(b"", archive.read(info))) is not None)
+            relationship_ids = None
+            if info.filename.endswith(".rels"):
+                relationship_ids = frozenset(rel_id.decode()
+                                             for rel_id in RELATIONSHIP_ID_PATTERN.findall(archive.read(info)))
+            members.append({
+                "info": info,
+                "data": package[data_start:data_start + info.compress_size],
+                "dynamic": dynamic,
+                "relationship_ids": relationship_ids,
+            })
+    return members
+
+
+def write_docx_package(target, template_members: list[Dict], rendered_parts: Dict[str, bytes]):
+    """
+    Writes the report's zip in the template's member order. Members in rendered_parts are deflated,
+    every other member's compressed bytes are copied as they are - no decompressing or recompressing.
+    target - a path or a binary buffer.
+    """
+    output = io.BytesIO()
+    central_records = []
+
+    for member in template_members:
+        info = member["info"]
+        name = info.filename.encode("utf-8")
+        flags = 0 if info.filename.isascii() else ZIP_UTF8_FLAG
+        year, month, day, hour, minute, second = info.date_time
+        dos_time = (hour << 11) | (minute << 5) | (second // 2)
+        dos_date = ((year - 1980) << 9) | (month << 5) | day
+
+        if info.filename in rendered_parts:
+            content = rendered_parts[info.filename]
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+            data = compressor.compress(content) + compressor.flush()
+            method, crc, size = zipfile.ZIP_DEFLATED, zlib.crc32(content), len(content)
+        else:
+            data = member["data"]
+            method, crc, size = info.compress_type, info.CRC, info.file_size
+
+        offset = output.tell()
+        output.write(ZIP_LOCAL_HEADER.pack(b"PK\x03\x04", 20, flags, method, dos_time, dos_date,
+                                           crc, len(data), size, len(name), 0))
+        output.write(name)
+        output.write(data)
+        central_records.append(ZIP_CENTRAL_HEADER.pack(b"PK\x01\x02", 20, 20, flags, method, dos_time, dos_date,
+                                                       crc, len(data), size, len(name), 0, 0, 0, 0,
+                                                       info.external_attr, offset) + name)
+
+    central_offset = output.tell()
+    for record in central_records:
+        output.write(record)
+    output.write(ZIP_END_RECORD.pack(b"PK\x05\x06", 0, 0, len(central_records), len(central_records),
+                                     output.tell() - central_offset, central_offset, 0))
+
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb") as f:
+            f.write(output.getbuffer())
+    else:
+        target.write(output.getbuffer())
+
+
+def has_template_relationships(package, template_members: list[Dict]) -> bool:
+    """
+    Whether every part (and the package) still has exactly the template's relationship ids,
+    so the template's *.rels members can be copied as they are.
+    """
+    template_ids = {member["info"].filename: member["relationship_ids"]
+                    for member in template_members if member["relationship_ids"] is not None}
+    current_ids = {PACKAGE_RELS_MEMBER: frozenset(package.rels)}
+    for part in package.iter_parts():
+        if part.rels:
+            current_ids[part.partname.rels_uri.lstrip("/")] = frozenset(part.rels)
+
+    return all(template_ids.get(name, frozenset()) == current_ids.get(name, frozenset())
+               for name in template_ids.keys() | current_ids.keys())
+
+
+def save_commander_docx(doc: DocxTemplate, target, template_path=TEMPLATE_PATH):
+    """
+    Saves a rendered report to a path or a binary buffer. With DOCX_PACKAGE_RENDERER only the parts
+    that change per report are serialized and compressed (see write_docx_package()).
+    """
+    if not DOCX_PACKAGE_RENDERER:
+        doc.save(target)
+        return
+
+    template_members = compile_template_package(template_path)
+    package = doc.docx.part.package
+    parts = {str(part.partname).lstrip("/"): part for part in package.iter_parts()}
+    if (not set(parts) <= {member["info"].filename for member in template_members}
+            or not has_template_relationships(package, template_members)):
+        # rendering added parts (e.g. images) or relationships (e.g. hyperlinks), so the template's
+        # [Content_Types].xml or *.rels no longer match - let python-docx write the whole package
+        doc.save(target)
+        return
+
+    rendered_parts = {member["info"].filename: parts[member["info"].filename].blob
+                      for member in template_members
+                      if member["dynamic"] and member["info"].filename in parts}
+    write_docx_package(target, template_members, rendered_parts)
+    instrumentation.count("docx_parts_copied", len(template_members) - len(rendered_parts))
+
+
+# ==== Compiled template
+PLACEHOLDER_TOKEN_PATTERN = re.compile(r"\{\{([^{}]+)\}\}")
+
+
+def iter_template_paragraphs(doc: Document):
+    """
+    Yields (part, paragraph) in the same order replace_placeholders visits them.
+    """
+    for paragraph in doc.paragraphs:
+        yield doc.part, paragraph
+
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                for paragraph in cell.paragraphs:
+                    yield doc.part, paragraph
+
+    for section in doc.sections:
+        for header_footer in [section.header, section.footer]:
+            for paragraph in header_footer.paragraphs:
+                yield header_footer.part, paragraph
+            for table in header_footer.tables:
+                for row in table.rows:
+                    for cell in row.cells:
+                        for paragraph in cell.paragraphs:
+                            yield header_footer.part, paragraph
+
+
+def get_element_path(element) -> tuple[int, ...]:
+    """
+    Returns the child indexes leading from the part's root element to element.
+    """
+    path = []
+    parent = element.getparent()
+    while parent is not None:
+        path.append(parent.index(element))
+        element, parent = parent, parent.getparent()
+    return tuple(reversed(path))
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template(template_path=TEMPLATE_PATH) -> Dict:
+    """
+    Parses the Word template once and indexes every paragraph holding {{placeholder}} tokens,
+    including tokens split across runs.
+    The compiled template is shared - render it with render_compiled_template(), never edit it.
+    """
+    import docx
+
+    doc = docx.Document(template_path)
+    locations = []
+    seen = set()
+
+    for part, paragraph in iter_template_paragraphs(doc):
+        big_text = "".join(run.text for run in paragraph.runs)
+        placeholders = list(dict.fromkeys(PLACEHOLDER_TOKEN_PATTERN.findall(big_text)))
+        if not placeholders:
+            continue
+
+        key = (str(part.partname), get_element_path(paragraph._p))
+        if key in seen:
+            continue
+        seen.add(key)
+
+        locations.append({
+            "partname": key[0],
+            "path": key[1],
+            "placeholders": placeholders,
+        })
+
+    return {"document": doc, "locations": locations}
+
+
+def render_compiled_template(compiled_template: Dict, values: Dict) -> Document:
+    """
+    Clones the compiled template and replaces placeholders only in the indexed paragraphs.
+    """
+    import docx.text.paragraph
+
+    doc = copy.deepcopy(compiled_template["document"])
+    parts = {str(part.partname): part for part in doc.part.package.iter_parts()}
+
+    for location in compiled_template["locations"]:
+        element = parts[location["partname"]].element
+        for child_index in location["path"]:
+            element = element[child_index]
+        paragraph = docx.text.paragraph.Paragraph(element, None)
+        replace_placeholders_in_paragraph(paragraph, values, location["placeholders"])
+
+    return doc
+
+
 def build_basic_info_context(df_commander: pd.DataFrame, commander: str) -> Dict:
     answers_num = len(df_commander)
     return {
@@ -283,6 +1001,10 @@ def build_basic_info_context(df_commander: pd.DataFrame, commander: str) -> Dict
     }
 
 
+# every punctuation char is wrapped with RLM marks in a single pass
+RTL_PUNCTUATION_TABLE = str.maketrans({ch: f"{RLM}{ch}{RLM}" for ch in PUNCTUATION_CHARS})
+
+
 def rtl_embed(text: str) -> str:
     "make sure text is in RTL format"
     if not isinstance(text, str):
@@ -292,20 +1014,44 @@ def rtl_embed(text: str) -> str:
     if not text:
         return text
 
-
-    for ch in PUNCTUATION_CHARS:
-        text = text.replace(ch, f"{RLM}{ch}{RLM}")
+    text = text.translate(RTL_PUNCTUATION_TABLE)
 
     return f"{RLE}{text}{PDF}"
 
 
+def prepare_open_text(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cleans every open question column of the whole frame once, for both the Word and the Excel reports.
+    Adds <column><CLEAN_TEXT_COLUMN_SUFFIX> (stripped, shorter than MIN_COMMENT_LENGTH -> missing)
+    and <column><RTL_TEXT_COLUMN_SUFFIX> (the same, RTL embedded) next to each open question.
+    """
+    prepared_columns: Dict[str, pd.Series] = {}
+
+    for column in OPEN_QUESTIONS_COLUMNS:
+        if column not in df.columns:
+            continue
+
+        text = df[column].dropna().astype(str).str.strip()
+        text = text[text.str.len() >= MIN_COMMENT_LENGTH]
+        rtl_text = RLE + text.str.translate(RTL_PUNCTUATION_TABLE) + PDF
+
+        prepared_columns[column + CLEAN_TEXT_COLUMN_SUFFIX] = text.reindex(df.index)
+        prepared_columns[column + RTL_TEXT_COLUMN_SUFFIX] = rtl_text.reindex(df.index)
+
+    return df.assign(**prepared_columns)
+
+
 def build_bullet_lists_context(df_commander: pd.DataFrame) -> Dict:
     context: Dict[str, Dict[str, list]] = {}
 
     for key, column_name in BULLET_LIST_CONTEXT.items():
         points: list[str] = []
+        prepared_column = column_name + RTL_TEXT_COLUMN_SUFFIX
 
-        if column_name in df_commander.columns:
+        if prepared_column in df_commander.columns:
+            points = df_commander[prepared_column].dropna().tolist()
+
+        elif column_name in df_commander.columns:
             series = df_commander[column_name].dropna().astype(str)
 
             cleaned_points: list[str] = []
@@ -337,7 +1083,6 @@ def merge_bullet_lists(df_commander: pd.DataFrame, commander: str):
 def add_bullet_lists(doc: DocxTemplate, df_commander: pd.DataFrame, commander: str):
     context = merge_bullet_lists(df_commander,commander)
     doc.render(context)
-    doc.save(OUTPUT_PATH + commander + ".docx")
 
 
 
@@ -374,6 +1119,9 @@ def build_quantitative_table_header() -> list[str]:
             f"{QUANT_SUBHEADER_STATEMENT} {index}",
             f"{QUANT_SUBHEADER_COMMANDER_PERCENT} {index}",
             f"{QUANT_SUBHEADER_COHORT_PERCENT} {index}",
+            f"{QUANT_SUBHEADER_RANK} {index}",
+            f"{QUANT_SUBHEADER_PERCENTILE} {index}",
+            f"{QUANT_SUBHEADER_ZSCORE} {index}",
         ])
 
     return header
@@ -403,10 +1151,7 @@ def build_quantitative_question_row(
     for option_offset, option_text in enumerate(options_for_question):
         base_col = 1 + option_offset * OPTION_BLOCK_WIDTH
         row[base_col] = option_text
-        if option_text == NONE_OF_THE_ABOVE_OPTION:
-            option_key = f"{NONE_OF_THE_ABOVE_OPTION}_{question_index}"
-        else:
-            option_key = option_text
+        option_key = get_option_key(question_index, option_text)
 
         percent_placeholder, total_placeholder = OPTIONS_TO_PLACEHOLDERS[option_key]
 
@@ -416,32 +1161,43 @@ def build_quantitative_question_row(
         row[base_col + 1] = commander_percent
         row[base_col + 2] = cohort_percent
 
+        for ranking_offset, ranking_placeholder in enumerate(OPTIONS_TO_RANKING_PLACEHOLDERS[option_key]):
+            row[base_col + 3 + ranking_offset] = placeholder_to_value.get(ranking_placeholder, "")
+
     return row
 
 
-def build_quantitative_sheet(
+def iter_quantitative_rows(
     df_commander: pd.DataFrame,
     placeholder_to_value: Dict,
     mahzor_averages: Dict
-) -> pd.DataFrame:
-    rows: list[list] = []
-    rows.extend(build_quantitative_header_block(df_commander, placeholder_to_value))
-    rows.append([])
-    rows.append(build_quantitative_table_header())
+):
+    """
+    Yields the rows of the quantitative sheet straight from the computed values.
+    """
+    yield from build_quantitative_header_block(df_commander, placeholder_to_value)
+    yield []
+    yield build_quantitative_table_header()
     total_columns = 1 + OPTIONS_PER_QUESTION * OPTION_BLOCK_WIDTH
     empty_row = [""] * total_columns
 
     # One row per question, with a blank row between questions
     for question_index, question in enumerate(MULTIPLE_CHOICE_COLUMNS):
-        row = build_quantitative_question_row(
+        yield build_quantitative_question_row(
             question_index=question_index,
             question=question,
             placeholder_to_value=placeholder_to_value,
             mahzor_averages=mahzor_averages,
         )
-        rows.append(row)
-        rows.append(empty_row)
+        yield empty_row
+
 
+def build_quantitative_sheet(
+    df_commander: pd.DataFrame,
+    placeholder_to_value: Dict,
+    mahzor_averages: Dict
+) -> pd.DataFrame:
+    rows = list(iter_quantitative_rows(df_commander, placeholder_to_value, mahzor_averages))
     df_quantitative = pd.DataFrame(rows)
     return df_quantitative
 
@@ -450,7 +1206,12 @@ def collect_text_answers(df_commander: pd.DataFrame) -> Dict[str, list[str]]:
     column_to_answers: Dict[str, list[str]] = {}
 
     for question in OPEN_QUESTIONS_COLUMNS:
-        if question in df_commander.columns:
+        prepared_column = question + CLEAN_TEXT_COLUMN_SUFFIX
+
+        if prepared_column in df_commander.columns:
+            answers = df_commander[prepared_column].dropna().tolist()
+
+        elif question in df_commander.columns:
             series = df_commander[question].dropna().astype(str)
             answers: list[str] = []
 
@@ -482,17 +1243,90 @@ def build_textual_sheet(df_commander: pd.DataFrame) -> pd.DataFrame:
     return df_textual
 
 
-def export_commander_excel(
+def iter_textual_rows(df_commander: pd.DataFrame):
+    """
+    Yields the header of the textual sheet, then one row per answer index.
+    Shorter columns are left empty instead of being padded.
+    """
+    column_to_answers = collect_text_answers(df_commander)
+    yield list(column_to_answers.keys())
+    yield from zip_longest(*column_to_answers.values())
+
+
+# Same look as the header pandas writes
+EXCEL_HEADER_FONT = Font(bold=True)
+EXCEL_HEADER_BORDER = Border(*(Side(style="thin"),) * 4)
+EXCEL_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+
+def write_streaming_sheet(workbook: openpyxl.Workbook, sheet_name: str, rows, styled_header: bool = False):
+    """
+    Appends rows to a new sheet of a write-only workbook; nothing is kept in memory after a row is written.
+    """
+    sheet = workbook.create_sheet(sheet_name)
+
+    for row_index, row in enumerate(rows):
+        values = list(row)
+
+        if styled_header and row_index == 0:
+            values = build_header_cells(sheet, values)
+
+        sheet.append(values)
+
+
+def build_header_cells(sheet, values: list) -> list:
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.font = EXCEL_HEADER_FONT
+        cell.border = EXCEL_HEADER_BORDER
+        cell.alignment = EXCEL_HEADER_ALIGNMENT
+        cells.append(cell)
+    return cells
+
+
+def write_commander_excel_streaming(
+    excel_path,
     df_commander: pd.DataFrame,
-    commander: str,
     placeholder_to_value: Dict,
-    mahzor_averages: Dict,
-    base_path: Optional[str] = None
+    mahzor_averages: Dict
 ) -> None:
-    output_base = base_path if base_path is not None else COMMANDER_EXCEL_OUTPUT_PATH
-    os.makedirs(output_base, exist_ok=True)
+    workbook = openpyxl.Workbook(write_only=True)
 
-    excel_path = os.path.join(output_base, f"{commander}.xlsx")
+    write_streaming_sheet(
+        workbook,
+        SHEET_NAME_QUANTITATIVE,
+        iter_quantitative_rows(df_commander, placeholder_to_value, mahzor_averages),
+    )
+    write_streaming_sheet(
+        workbook,
+        SHEET_NAME_TEXTUAL,
+        iter_textual_rows(df_commander),
+        styled_header=True,
+    )
+
+    workbook.save(excel_path)
+
+
+def write_commander_excel(
+    target,
+    df_commander: pd.DataFrame,
+    placeholder_to_value: Dict,
+    mahzor_averages: Dict,
+    streaming: bool = EXCEL_STREAMING_EXPORT
+) -> None:
+    """
+    Writes the commander's workbook to target - a path or a binary buffer.
+    streaming - write rows directly with a write-only workbook instead of building DataFrames.
+    """
+    if streaming:
+        write_commander_excel_streaming(
+            target,
+            df_commander=df_commander,
+            placeholder_to_value=placeholder_to_value,
+            mahzor_averages=mahzor_averages,
+        )
+        return
 
     df_quantitative = build_quantitative_sheet(
         df_commander=df_commander,
@@ -502,7 +1336,7 @@ def export_commander_excel(
 
     df_textual = build_textual_sheet(df_commander=df_commander)
 
-    with pd.ExcelWriter(excel_path) as writer:
+    with pd.ExcelWriter(target, engine="openpyxl") as writer:
         df_quantitative.to_excel(
             writer,
             sheet_name=SHEET_NAME_QUANTITATIVE,
@@ -515,37 +1349,888 @@ def export_commander_excel(
             index=False,
         )
 
+
+def export_commander_excel(
+    df_commander: pd.DataFrame,
+    commander: str,
+    placeholder_to_value: Dict,
+    mahzor_averages: Dict,
+    base_path: Optional[str] = None,
+    streaming: bool = EXCEL_STREAMING_EXPORT
+) -> None:
+    output_base = base_path if base_path is not None else COMMANDER_EXCEL_OUTPUT_PATH
+    os.makedirs(output_base, exist_ok=True)
+
+    excel_path = os.path.join(output_base, f"{commander}.xlsx")
+
+    write_commander_excel(excel_path, df_commander, placeholder_to_value, mahzor_averages, streaming)
+
+    instrumentation.record_artifact(excel_path)
     print(f"Excel for commander {commander} written to: {excel_path}")
 
-def main(file_path=INPUT_PATH):
-    if not validate_excel(file_path):
-        print("Excel file validation failed.")
-        return
 
-    df = excel_to_dataframe(file_path)
-    # clen up empty rows / rows without commander name
-    df = df.dropna(how="all")
-    df = df.dropna(subset=[COMMANDER_COLUMN])
+# ==== Cohort workbook
+def iter_cohort_quantitative_rows(df_commander: pd.DataFrame, commander: str,
+                                  placeholder_to_value: Dict, mahzor_averages: Dict):
+    """
+    The commander's rows of the cohort quantitative table, one per option:
+    commander, question, option, commander %, cohort %, rank, percentile, z-score.
+    Then the respondents and the general question.
+    """
+    for question_index, question in enumerate(MULTIPLE_CHOICE_COLUMNS):
+        for option in QUESTION_TO_OPTIONS[question]:
+            option_key = get_option_key(question_index, option)
+            percent_placeholder, total_placeholder = OPTIONS_TO_PLACEHOLDERS[option_key]
+            yield [commander, question, option,
+                   placeholder_to_value.get(percent_placeholder, ""), mahzor_averages.get(total_placeholder, ""),
+                   *(placeholder_to_value.get(ranking_placeholder, "")
+                     for ranking_placeholder in OPTIONS_TO_RANKING_PLACEHOLDERS[option_key])]
+
+    yield [commander, QUANT_HEADER_LABEL_NUM_RESPONDENTS, "", len(df_commander), "", "", "", ""]
+    yield [commander, GENERAL_QUESTION_COLUMN, COHORT_OPTION_AVERAGE,
+           placeholder_to_value.get("average_general", ""), mahzor_averages.get("total_general", ""),
+           *(placeholder_to_value.get(ranking_placeholder, "") for ranking_placeholder in GENERAL_RANKING_PLACEHOLDERS)]
+    yield [commander, GENERAL_QUESTION_COLUMN, COHORT_OPTION_STD, placeholder_to_value.get("std_general", ""),
+           "", "", "", ""]
+
+
+def iter_cohort_textual_rows(df_commander: pd.DataFrame, commander: str):
+    """
+    The commander's rows of the cohort text table: commander, question, answer.
+    """
+    for question, answers in collect_text_answers(df_commander).items():
+        for answer in answers:
+            yield [commander, question, answer]
+
+
+def write_cohort_excel(target, commander_values, mahzor_averages: Dict) -> None:
+    """
+    Writes one workbook with every commander: a long-format quantitative table and one text table.
+    commander_values - (commander, df_commander, placeholder_to_value) per commander, consumed once;
+    both sheets are written row by row as the commanders come.
+    target - a path or a binary buffer.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    quantitative_sheet = workbook.create_sheet(SHEET_NAME_QUANTITATIVE)
+    textual_sheet = workbook.create_sheet(SHEET_NAME_TEXTUAL)
+    quantitative_sheet.append(build_header_cells(quantitative_sheet, COHORT_QUANTITATIVE_HEADER))
+    textual_sheet.append(build_header_cells(textual_sheet, COHORT_TEXTUAL_HEADER))
+
+    for commander, df_commander, placeholder_to_value in commander_values:
+        for row in iter_cohort_quantitative_rows(df_commander, commander, placeholder_to_value, mahzor_averages):
+            quantitative_sheet.append(row)
+        for row in iter_cohort_textual_rows(df_commander, commander):
+            textual_sheet.append(row)
+
+    workbook.save(target)
+
+
+def get_output_paths(output_root: Optional[str] = None) -> Dict[str, str]:
+    """
+    Where a run writes its artifacts - the paths in constants.py, or the same layout under output_root.
+    """
+    if output_root is None:
+        return {
+            "docx": OUTPUT_PATH,
+            "excel": COMMANDER_EXCEL_OUTPUT_PATH,
+            "manifest": BUILD_MANIFEST_PATH,
+            "state": AGGREGATE_STATE_PATH,
+            "cache": PARSED_CACHE_DIR,
+            "cohort_excel": OUTPUT_PATH + COHORT_EXCEL_FILENAME,
+        }
+
+    return {
+        "docx": os.path.join(output_root, ""),
+        "excel": os.path.join(output_root, "excel", ""),
+        "manifest": os.path.join(output_root, os.path.basename(BUILD_MANIFEST_PATH)),
+        "state": os.path.join(output_root, os.path.basename(AGGREGATE_STATE_PATH)),
+        "cache": os.path.join(output_root, os.path.basename(os.path.normpath(PARSED_CACHE_DIR)), ""),
+        "cohort_excel": os.path.join(output_root, COHORT_EXCEL_FILENAME),
+    }
+
+
+# ==== Incremental builds
+def hash_file(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compute_build_fingerprint(mahzor_averages: Dict, template_path=TEMPLATE_PATH) -> str:
+    """
+    Hashes everything a report depends on besides the commander's own rows:
+    the template, the cohort aggregates and the generator code itself.
+    """
+    digest = hashlib.sha256()
+    for path in [template_path, os.path.abspath(__file__), constants.__file__]:
+        digest.update(hash_file(path).encode())
+    digest.update(json.dumps(mahzor_averages, sort_keys=True, ensure_ascii=False, default=str).encode())
+    return digest.hexdigest()
+
+
+def get_partition_row_hashes(partitions: Mapping, commander: str) -> bytes:
+    """
+    The commander's rows hashed for the build key. Streamed partitions were hashed as their rows
+    were read (see stream_answers()), so they are not read back from the spill files for it.
+    """
+    if isinstance(partitions, SpilledPartitions):
+        return partitions.buffers[commander]["digest"].digest()
+    return pd.util.hash_pandas_object(partitions[commander], index=False).to_numpy().tobytes()
+
+
+def compute_commander_build_key(row_hashes: bytes, fingerprint: str,
+                                rankings: Optional[Dict] = None) -> str:
+    """
+    row_hashes - see get_partition_row_hashes().
+    rankings - the commander's ranking placeholders; they depend on every commander's aggregates,
+    so a change elsewhere in the cohort can change them while the cohort averages stay the same.
+    """
+    digest = hashlib.sha256(fingerprint.encode())
+    digest.update(row_hashes)
+    digest.update(json.dumps(rankings or {}, sort_keys=True, ensure_ascii=False, default=str).encode())
+    return digest.hexdigest()
+
+
+def get_artifact_paths(commander: str, output_paths: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Where the commander's reports are written, keyed like get_archive_members().
+    """
+    if output_paths is None:
+        output_paths = get_output_paths()
+    return {
+        "docx": output_paths["docx"] + commander + ".docx",
+        "excel": os.path.join(output_paths["excel"], f"{commander}.xlsx"),
+    }
+
+
+def get_commander_artifacts(commander: str, output_paths: Optional[Dict[str, str]] = None) -> list[str]:
+    return list(get_artifact_paths(commander, output_paths).values())
+
+
+def load_build_manifest(manifest_path=BUILD_MANIFEST_PATH) -> Dict[str, str]:
+    """
+    Returns commander -> build key of the last successful build, empty if there is no usable manifest.
+    """
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-    mahzor_averages = calculate_total_percentage(df)
+    if manifest.get("version") != BUILD_MANIFEST_VERSION:
+        return {}
+    return manifest.get("commanders", {})
 
-    for commander in df[COMMANDER_COLUMN].unique():
-        df_commander = df[df[COMMANDER_COLUMN] == commander]
-        placeholder_to_value = calculations_on_seperated_data(df_commander, commander)
-        # merge with mahzor averages
-        placeholder_to_value.update(mahzor_averages)
 
-        if not validate_calculations(placeholder_to_value):
-            print("Calculations validation failed.")
+def save_build_manifest(build_keys: Dict[str, str], manifest_path=BUILD_MANIFEST_PATH):
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"version": BUILD_MANIFEST_VERSION, "commanders": build_keys}, f,
+                  ensure_ascii=False, indent=2)
+
+
+def is_commander_up_to_date(manifest: Dict[str, str], commander: str, build_key: str,
+                            output_paths: Optional[Dict[str, str]] = None) -> bool:
+    if manifest.get(commander) != build_key:
+        return False
+    return all(os.path.exists(path) for path in get_commander_artifacts(commander, output_paths))
+
+
+# ==== Delta ingestion
+def load_aggregate_state(state_path=AGGREGATE_STATE_PATH) -> Optional[Dict]:
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if state.get("version") != AGGREGATE_STATE_VERSION or state.get("columns") != COLUMNS:
+        return None
+    return state
+
+
+def save_aggregate_state(state: Dict, state_path=AGGREGATE_STATE_PATH):
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+def ingest_new_responses(df: pd.DataFrame, state_path=AGGREGATE_STATE_PATH) -> Dict:
+    """
+    Folds only the rows newer than the last processed Timestamp into the saved state.
+    The state is rebuilt from all rows when it is missing, was made for other COLUMNS,
+    or the rows it covers changed (the export is no longer an append of the previous one).
+    Rows without a Timestamp are only counted when the state is rebuilt; a state without
+    a last Timestamp (no row had one) is always rebuilt.
+    """
+    timestamps = pd.to_datetime(df[TIMESTAMP_COLUMN], errors="coerce")
+    state = load_aggregate_state(state_path)
+
+    if state is not None and state.get("last_timestamp") is None:
+        state = None
+
+    if state is not None:
+        last_timestamp = pd.Timestamp(state["last_timestamp"])
+        if int((timestamps <= last_timestamp).sum()) != state["rows_processed"]:
+            print("Processed responses changed since the last run, rebuilding the aggregate state.")
+            state = None
+
+    if state is None:
+        state = {"version": AGGREGATE_STATE_VERSION, "columns": COLUMNS, "commanders": {}}
+        new_rows = df
+    else:
+        new_rows = df[timestamps > last_timestamp]
+
+    merge_commander_aggregates(state["commanders"], build_commander_aggregates(new_rows))
+
+    last_timestamp = timestamps.max()
+    state["last_timestamp"] = None if pd.isna(last_timestamp) else last_timestamp.isoformat()
+    state["rows_processed"] = int((timestamps <= last_timestamp).sum()) if state["last_timestamp"] else 0
+    save_aggregate_state(state, state_path)
+
+    print(f"Ingested {len(new_rows)} new responses.")
+    return state
+
+
+# ==== Streaming aggregation
+COLUMN_POSITIONS = {column: position for position, column in enumerate(COLUMNS)}
+
+
+def iter_answer_rows(file_path=INPUT_PATH):
+    """
+    Streams the answer rows of the first sheet in COLUMNS order, with the cleaning of load_answers():
+    text columns as strings, empty cells as None, rows without a commander skipped.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        positions = [header.index(column) for column in COLUMNS]
+        commander_position = COLUMN_POSITIONS[COMMANDER_COLUMN]
+
+        for raw_row in rows:
+            row = []
+            for column, position in zip(COLUMNS, positions):
+                value = raw_row[position] if position < len(raw_row) else None
+                if value == "":
+                    value = None
+                elif value is not None and column in COLUMN_DTYPES:
+                    value = str(value)
+                row.append(value)
+            if row[commander_position] is not None:
+                yield row
+    finally:
+        workbook.close()
+
+
+def general_answer_to_number(value) -> float:
+    """
+    general_answers_to_numeric() for a single cell.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return math.nan
+
+
+def fold_answer_row(aggregate: Dict, row: list):
+    """
+    Adds one answer row (in COLUMNS order) to a commander's aggregate.
+    """
+    aggregate["respondents"] += 1
+    for question_index, question in enumerate(MULTIPLE_CHOICE_COLUMNS):
+        answer = row[COLUMN_POSITIONS[question]]
+        if answer is None:
+            continue
+        options = QUESTION_TO_OPTIONS[question]
+        for option_offset in parse_choice_answer(question, answer):
+            aggregate["option_counts"][get_option_key(question_index, options[option_offset])] += 1
+
+    general = general_answer_to_number(row[COLUMN_POSITIONS[GENERAL_QUESTION_COLUMN]])
+    if not math.isnan(general):
+        aggregate["general_count"] += 1
+        aggregate["general_sum"] += general
+        aggregate["general_sum_sq"] += general * general
+
+
+def estimate_row_size(row: list) -> int:
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+
+
+def stream_answers(file_path, spill_dir: str,
+                   memory_budget: int = STREAMING_MEMORY_BUDGET) -> tuple[Dict[str, Dict], Dict[str, Dict]]:
+    """
+    One read-only pass over the workbook: every row is folded into its commander's aggregate
+    and kept for the commander's reports. When the kept rows pass memory_budget bytes they are
+    appended to one spill file per commander under spill_dir. Every row is also hashed into its commander's
+    digest, the build key's view of the rows.
+    Returns (commander -> aggregate, commander -> {"spill_path", "rows", "digest"}), both in order of first appearance.
+    """
+    aggregates: Dict[str, Dict] = {}
+    buffers: Dict[str, Dict] = {}
+    buffered_bytes = 0
+    commander_position = COLUMN_POSITIONS[COMMANDER_COLUMN]
+
+    for row in iter_answer_rows(file_path):
+        commander = row[commander_position]
+        if commander not in aggregates:
+            aggregates[commander] = new_aggregate()
+            buffers[commander] = {"spill_path": os.path.join(spill_dir, f"{len(buffers)}.pickle"), "rows": [],
+                                  "digest": hashlib.sha256()}
+        fold_answer_row(aggregates[commander], row)
+        buffers[commander]["rows"].append(row)
+        buffers[commander]["digest"].update(pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL))
+        buffered_bytes += estimate_row_size(row)
+
+        if buffered_bytes > memory_budget:
+            spill_rows(buffers)
+            buffered_bytes = 0
+
+    instrumentation.count("rows_loaded", sum(aggregate["respondents"] for aggregate in aggregates.values()))
+    return aggregates, buffers
+
+
+def spill_rows(buffers: Dict[str, Dict]):
+    with instrumentation.stage("spill_rows"):
+        for buffer in buffers.values():
+            if buffer["rows"]:
+                with open(buffer["spill_path"], "ab") as f:
+                    pickle.dump(buffer["rows"], f, protocol=pickle.HIGHEST_PROTOCOL)
+                buffer["rows"] = []
+
+
+def load_spilled_partition(buffer: Dict) -> pd.DataFrame:
+    """
+    The commander's rows as a frame like the partitions of partition_by_commander().
+    """
+    rows = []
+    if os.path.exists(buffer["spill_path"]):
+        with open(buffer["spill_path"], "rb") as f:
+            while True:
+                try:
+                    rows.extend(pickle.load(f))
+                except EOFError:
+                    break
+    rows.extend(buffer["rows"])
+
+    df_commander = pd.DataFrame(rows, columns=COLUMNS)
+    df_commander[GENERAL_QUESTION_COLUMN] = general_answers_to_numeric(df_commander[GENERAL_QUESTION_COLUMN])
+    df_commander[COMMANDER_COLUMN] = df_commander[COMMANDER_COLUMN].astype("category")
+    return prepare_open_text(df_commander)
+
+
+class SpilledPartitions(Mapping):
+    """
+    commander -> partition, read back from the spill files one commander at a time.
+    """
+
+    def __init__(self, buffers: Dict[str, Dict]):
+        self.buffers = buffers
+
+    def __getitem__(self, commander: str) -> pd.DataFrame:
+        return load_spilled_partition(self.buffers[commander])
+
+    def __iter__(self):
+        return iter(self.buffers)
+
+    def __len__(self) -> int:
+        return len(self.buffers)
+
+
+def stream_cohort(file_path, spill_dir: str, memory_budget: int = STREAMING_MEMORY_BUDGET) -> Optional[Dict]:
+    """
+    prepare_cohort() without loading the workbook: the stats come from stream_answers() and the
+    partitions are read back from the spill files on access.
+    Returns None if validation fails.
+    """
+    with instrumentation.stage("validate_excel"):
+        if not validate_excel(file_path):
+            print("Excel file validation failed.")
+            return None
+
+    with instrumentation.stage("stream_answers"):
+        commander_aggregates, buffers = stream_answers(file_path, spill_dir, memory_budget)
+
+    commander_counts: Dict[str, pd.Series] = {}
+    general_stats: Dict[str, Dict] = {}
+    for commander, aggregate in commander_aggregates.items():
+        commander_counts[commander], general_stats[commander] = commander_stats_from_aggregate(aggregate)
+
+    return {
+        "mahzor_averages": cohort_averages_from_aggregate(combine_aggregates(commander_aggregates.values())),
+        "commander_counts": commander_counts,
+        "general_stats": general_stats,
+        "rankings": compute_cohort_rankings(commander_aggregates),
+        "partitions": SpilledPartitions(buffers),
+    }
+
+
+def build_commander_values(df_commander: pd.DataFrame, commander: str,
+                           option_counts: Optional[pd.Series], mahzor_averages: Dict,
+                           general_stats: Optional[Dict] = None,
+                           rankings: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    The commander's placeholder values merged with the cohort's; None if the calculations validation failed.
+    rankings - the commander's ranking placeholders (see compute_cohort_rankings()).
+    """
+    with instrumentation.stage("calculations_on_seperated_data", commander):
+        placeholder_to_value = calculations_on_seperated_data(df_commander, commander, option_counts,
+                                                              general_stats)
+    # merge with mahzor averages
+    placeholder_to_value.update(mahzor_averages)
+    if rankings:
+        placeholder_to_value.update(rankings)
+
+    if not validate_calculations(placeholder_to_value):
+        print("Calculations validation failed.")
+        return None
+    return placeholder_to_value
+
+
+def generate_commander_reports(df_commander: pd.DataFrame, commander: str,
+                               option_counts: Optional[pd.Series], mahzor_averages: Dict,
+                               general_stats: Optional[Dict] = None,
+                               output_paths: Optional[Dict[str, str]] = None,
+                               formats=REPORT_FORMATS, rankings: Optional[Dict] = None) -> bool:
+    """
+    Computes the commander's stats and writes the Word and Excel reports.
+    formats - the reports to write, a subset of REPORT_FORMATS.
+    Returns False if the calculations validation failed.
+    """
+    if output_paths is None:
+        output_paths = get_output_paths()
+    placeholder_to_value = build_commander_values(df_commander, commander, option_counts,
+                                                  mahzor_averages, general_stats, rankings)
+    if placeholder_to_value is None:
+        return False
+
+    if "docx" in formats:
+        with instrumentation.stage("generate_and_fill_commander_docx", commander):
+            generate_and_fill_commander_docx(df_commander, placeholder_to_value, commander,
+                                             output_path=output_paths["docx"])
+    if "excel" in formats:
+        with instrumentation.stage("export_commander_excel", commander):
+            export_commander_excel(
+                df_commander=df_commander,
+                commander=commander,
+                placeholder_to_value=placeholder_to_value,
+                mahzor_averages=mahzor_averages,
+                base_path=output_paths["excel"],
+            )
+    return True
+
+
+def get_archive_members(commander: str) -> Dict[str, str]:
+    """
+    The names of the commander's reports in an archive - the same layout as the output folders.
+    """
+    return {
+        "docx": commander + ".docx",
+        "excel": ARCHIVE_EXCEL_FOLDER + commander + ".xlsx",
+    }
+
+
+def render_commander_reports(df_commander: pd.DataFrame, commander: str,
+                             option_counts: Optional[pd.Series], mahzor_averages: Dict,
+                             general_stats: Optional[Dict] = None,
+                             formats=REPORT_FORMATS, rankings: Optional[Dict] = None) -> Optional[Dict[str, bytes]]:
+    """
+    Computes the commander's stats and renders the Word and Excel reports in memory.
+    formats - the reports to render, a subset of REPORT_FORMATS.
+    Returns archive member name -> bytes, or None if the calculations validation failed.
+    """
+    placeholder_to_value = build_commander_values(df_commander, commander, option_counts,
+                                                  mahzor_averages, general_stats, rankings)
+    if placeholder_to_value is None:
+        return None
+
+    members = get_archive_members(commander)
+    artifacts: Dict[str, bytes] = {}
+    if "docx" in formats:
+        with instrumentation.stage("generate_and_fill_commander_docx", commander):
+            artifacts[members["docx"]] = render_commander_docx_bytes(df_commander, placeholder_to_value, commander)
+    if "excel" in formats:
+        with instrumentation.stage("export_commander_excel", commander):
+            excel_buffer = io.BytesIO()
+            write_commander_excel(excel_buffer, df_commander, placeholder_to_value, mahzor_averages)
+            artifacts[members["excel"]] = excel_buffer.getvalue()
+    return artifacts
+
+
+def write_to_archive(archive: zipfile.ZipFile, artifacts: Dict[str, bytes]):
+    # docx and xlsx are already compressed, so they are stored as is
+    for name, data in artifacts.items():
+        archive.writestr(name, data, compress_type=zipfile.ZIP_STORED)
+        instrumentation.record_artifact(name, len(data))
+
+
+# ==== Background writer
+def start_writer(num_threads: int = WRITER_THREADS, queue_size: int = WRITER_QUEUE_SIZE) -> Dict:
+    """
+    Starts writer threads draining a bounded queue of (commander, path, bytes).
+    Queueing blocks while the queue is full, so rendering never runs more than queue_size files ahead of the disk.
+    """
+    writer = {"queue": queue.Queue(maxsize=queue_size), "threads": [], "failed": []}
+    for _ in range(num_threads):
+        thread = threading.Thread(target=drain_writes, args=(writer,), daemon=True)
+        thread.start()
+        writer["threads"].append(thread)
+    return writer
+
+
+def drain_writes(writer: Dict):
+    while True:
+        item = writer["queue"].get()
+        if item is None:
             return
+        commander, path, data = item
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            print(f"Report for commander {commander} written to: {path}")
+        except Exception as e:
+            print(f"❌ Writing {path} failed: {e}")
+            writer["failed"].append(commander)
+
+
+def queue_commander_writes(writer: Dict, commander: str, artifacts: Dict[str, bytes],
+                           output_paths: Optional[Dict[str, str]] = None):
+    """
+    Hands rendered reports (see render_commander_reports()) to the writer threads.
+    """
+    paths = get_artifact_paths(commander, output_paths)
+    for key, member in get_archive_members(commander).items():
+        if member in artifacts:
+            instrumentation.record_artifact(paths[key], len(artifacts[member]))
+            writer["queue"].put((commander, paths[key], artifacts[member]))
+
+
+def stop_writer(writer: Dict) -> list[str]:
+    """
+    Waits for the queued writes to finish. Returns the commanders with a failed write.
+    """
+    for _ in writer["threads"]:
+        writer["queue"].put(None)
+    for thread in writer["threads"]:
+        thread.join()
+    return list(dict.fromkeys(writer["failed"]))
+
+
+def iter_cohort_values(commander_partitions, commander_counts: Dict[str, pd.Series],
+                       mahzor_averages: Dict, general_stats: Dict[str, Dict],
+                       rankings: Optional[Dict[str, Dict]] = None):
+    """
+    Yields (commander, df_commander, placeholder_to_value) for write_cohort_excel(), one commander at a time.
+    commander_partitions - (commander, df_commander) pairs, consumed as the workbook is written.
+    Commanders whose calculations validation failed are left out.
+    """
+    for commander, df_commander in commander_partitions:
+        placeholder_to_value = build_commander_values(df_commander, commander, commander_counts.get(commander),
+                                                      mahzor_averages, general_stats.get(commander),
+                                                      rankings.get(commander) if rankings else None)
+        if placeholder_to_value is not None:
+            yield commander, df_commander, placeholder_to_value
+
+
+def run_instrumented(func, *args):
+    """
+    Runs func in a worker process, returning the worker's metrics with the result.
+    """
+    instrumentation.enable()
+    instrumentation.reset()
+    return func(*args), instrumentation.snapshot()
+
+
+def run_commanders_in_parallel(partitions: Dict[str, pd.DataFrame], commander_counts: Dict[str, pd.Series],
+                               mahzor_averages: Dict, workers: Optional[int],
+                               general_stats: Optional[Dict[str, Dict]] = None,
+                               output_paths: Optional[Dict[str, str]] = None,
+                               executor: Optional[ProcessPoolExecutor] = None,
+                               sink: Optional[Callable[[str, Dict[str, bytes]], None]] = None,
+                               formats=REPORT_FORMATS,
+                               rankings: Optional[Dict[str, Dict]] = None) -> list[str]:
+    """
+    Fans the commanders out to a process pool (workers=None uses all cores).
+    executor - an existing pool to use, e.g. one shared by several cohorts.
+    sink - the workers render in memory and this process passes each commander's reports
+    (member name -> bytes) to sink(commander, artifacts), in commander order.
+    Without it every worker writes its own files.
+    A failing commander does not stop the others.
+    Returns the commanders whose reports failed, in commander order.
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as own_executor:
+            return run_commanders_in_parallel(partitions, commander_counts, mahzor_averages, workers,
+                                              general_stats, output_paths, own_executor, sink, formats, rankings)
+
+    failed: list[str] = []
+    instrumented = instrumentation.is_enabled()
+
+    futures = {}
+    for commander, df_commander in partitions.items():
+        args = [df_commander, commander, commander_counts.get(commander), mahzor_averages,
+                general_stats.get(commander) if general_stats else None]
+        commander_rankings = rankings.get(commander) if rankings else None
+        if sink is None:
+            task = [generate_commander_reports, *args, output_paths, formats, commander_rankings]
+        else:
+            task = [render_commander_reports, *args, formats, commander_rankings]
+        if instrumented:
+            task = [run_instrumented, *task]
+        futures[commander] = executor.submit(*task)
+
+    for commander, future in futures.items():
+        try:
+            result = future.result()
+            if instrumented:
+                result, metrics = result
+                instrumentation.merge(metrics)
+            if sink is not None and result is not None:
+                sink(commander, result)
+            succeeded = bool(result)
+        except Exception as e:
+            print(f"❌ Report for commander {commander} failed: {e}")
+            succeeded = False
+        if not succeeded:
+            failed.append(commander)
+
+    return failed
+
+
+def prepare_cohort(df: pd.DataFrame, state_path: Optional[str] = None) -> Dict:
+    """
+    Everything the commanders' reports need from the loaded answers:
+    mahzor_averages, commander_counts, general_stats, rankings and the per-commander partitions.
+    state_path - take the aggregates from the delta ingestion state there.
+    """
+    if state_path is not None:
+        with instrumentation.stage("ingest_new_responses"):
+            commander_aggregates = ingest_new_responses(df, state_path)["commanders"]
+    else:
+        with instrumentation.stage("build_commander_aggregates"):
+            commander_aggregates = build_commander_aggregates(df)
+
+    # cohort numbers are merged from the commanders' aggregates, not rescanned
+    mahzor_averages = cohort_averages_from_aggregate(combine_aggregates(commander_aggregates.values()))
+    commander_counts: Dict[str, pd.Series] = {}
+    general_stats: Dict[str, Dict] = {}
+    for commander, aggregate in commander_aggregates.items():
+        commander_counts[commander], general_stats[commander] = commander_stats_from_aggregate(aggregate)
+
+    with instrumentation.stage("compute_cohort_rankings"):
+        rankings = compute_cohort_rankings(commander_aggregates)
+
+    with instrumentation.stage("prepare_open_text"):
+        df = prepare_open_text(df)
+
+    with instrumentation.stage("partition_by_commander"):
+        partitions = partition_by_commander(df)
+
+    return {
+        "mahzor_averages": mahzor_averages,
+        "commander_counts": commander_counts,
+        "general_stats": general_stats,
+        "rankings": rankings,
+        "partitions": partitions,
+    }
+
+
+def run_reports(file_path=INPUT_PATH, workers: Optional[int] = DEFAULT_WORKERS,
+                incremental: bool = INCREMENTAL_BUILD, delta: bool = DELTA_INGESTION,
+                output_root: Optional[str] = None,
+                executor: Optional[ProcessPoolExecutor] = None,
+                archive_path: Optional[str] = None,
+                commanders: Optional[list[str]] = None,
+                formats=REPORT_FORMATS,
+                streaming: bool = STREAMING_AGGREGATION,
+                pipelined: bool = PIPELINED_WRITES,
+                cohort_excel: bool = COHORT_EXCEL_EXPORT) -> bool:
+    """
+    The flow of main(), without the instrumentation wrapper.
+    output_root - write under this directory instead of the paths in constants.py.
+    executor - a process pool to fan the commanders out to, shared between runs.
+    archive_path - write every report into this zip archive instead of loose files.
+    The archive is always rebuilt whole, so incremental builds do not apply to it.
+    commanders - write only these commanders' reports (the cohort stats still use every row).
+    formats - write only these reports, a subset of REPORT_FORMATS. The build manifest tracks
+    complete builds, so a partial run always rewrites the selected reports.
+    streaming - stream the workbook into aggregates instead of loading it (see stream_answers()).
+    The commanders are then rendered one at a time in this process, so workers, executor and delta do not apply.
+    pipelined - render to bytes and leave the file writes to background threads (see start_writer()),
+    so rendering the next commander overlaps the previous one's disk I/O.
+    cohort_excel - write one cohort workbook (see write_cohort_excel()) instead of a workbook per commander.
+    Returns True if every selected commander's reports were written.
+    """
+    output_paths = get_output_paths(output_root)
+    spill_dir = None
+    archive = None
+    writer = None
+    failed_writes: list[str] = []
+
+    try:
+        if streaming:
+            spill_dir = tempfile.TemporaryDirectory(prefix="mashov_spill_")
+            cohort = stream_cohort(file_path, spill_dir.name)
+            workers, executor = 1, None
+        else:
+            df = load_answers(file_path, cache_dir=output_paths["cache"] if PARSED_CACHE else None)
+            cohort = None if df is None else prepare_cohort(df, output_paths["state"] if delta else None)
+            del df
+        if cohort is None:
+            return False
+        if archive_path is None:
+            os.makedirs(output_paths["docx"], exist_ok=True)
+        else:
+            incremental = False
+        write_cohort_workbook = cohort_excel and "excel" in formats
+        if cohort_excel:
+            formats = tuple(report_format for report_format in formats if report_format != "excel")
+        if set(formats) != set(REPORT_FORMATS):
+            incremental = False
+
+        mahzor_averages = cohort["mahzor_averages"]
+        commander_counts = cohort["commander_counts"]
+        general_stats = cohort["general_stats"]
+        rankings = cohort["rankings"]
+        partitions = cohort["partitions"]
+
+        # partitions are only looked up by name from here on, so streamed ones are read back one at a time
+        selected = list(partitions)
+        missing = []
+        if commanders is not None:
+            missing = [commander for commander in commanders if commander not in partitions]
+            if missing:
+                print(f"❌ No answers for commanders: {', '.join(missing)}")
+            selected = [commander for commander in commanders if commander in partitions]
+
+        build_keys: Dict[str, str] = {}
+        up_to_date: list[str] = []
+        manifest: Dict[str, str] = {}
+        if incremental:
+            manifest = load_build_manifest(output_paths["manifest"])
+            fingerprint = compute_build_fingerprint(mahzor_averages)
+            for commander in selected:
+                build_keys[commander] = compute_commander_build_key(get_partition_row_hashes(partitions, commander),
+                                                                    fingerprint, rankings.get(commander))
+            up_to_date = [commander for commander in selected
+                          if is_commander_up_to_date(manifest, commander, build_keys[commander], output_paths)]
+            if up_to_date:
+                print(f"Skipping {len(up_to_date)} unchanged commanders.")
+
+        stale = [commander for commander in selected if commander not in up_to_date]
+
+        sink = None
+        if archive_path is not None:
+            os.makedirs(os.path.dirname(archive_path) or ".", exist_ok=True)
+            archive = zipfile.ZipFile(archive_path, "w")
+            sink = lambda commander, artifacts: write_to_archive(archive, artifacts)
+        elif pipelined:
+            writer = start_writer()
+            sink = lambda commander, artifacts: queue_commander_writes(writer, commander, artifacts, output_paths)
+
+        if executor is not None or workers is None or workers > 1:
+            failed = run_commanders_in_parallel({commander: partitions[commander] for commander in stale},
+                                                commander_counts, mahzor_averages, workers,
+                                                general_stats, output_paths, executor, sink, formats, rankings)
+            if failed:
+                print(f"❌ Reports failed for commanders: {', '.join(failed)}")
+            built = [commander for commander in stale if commander not in failed]
+            stale_partitions = ((commander, partitions[commander]) for commander in stale)
+        else:
+            built = []
+
+            def render_stale_partitions():
+                """
+                Renders the stale commanders in order and yields every partition it loaded, so the cohort
+                workbook reuses it - a streamed partition is read back once. Rendering stops at the first failure.
+                """
+                rendering = True
+                for commander in stale:
+                    df_commander = partitions[commander]
+                    if rendering:
+                        args = [df_commander, commander, commander_counts.get(commander), mahzor_averages,
+                                general_stats.get(commander)]
+                        if sink is None:
+                            succeeded = generate_commander_reports(*args, output_paths, formats,
+                                                                   rankings.get(commander))
+                        else:
+                            artifacts = render_commander_reports(*args, formats, rankings.get(commander))
+                            succeeded = artifacts is not None
+                            if succeeded:
+                                sink(commander, artifacts)
+                        if succeeded:
+                            built.append(commander)
+                        rendering = succeeded
+                    yield commander, df_commander
+
+            stale_partitions = render_stale_partitions()
+
+        if write_cohort_workbook:
+            with instrumentation.stage("write_cohort_excel"):
+                commander_values = iter_cohort_values(stale_partitions, commander_counts,
+                                                      mahzor_averages, general_stats, rankings)
+                if archive is None:
+                    write_cohort_excel(output_paths["cohort_excel"], commander_values, mahzor_averages)
+                    instrumentation.record_artifact(output_paths["cohort_excel"])
+                    print(f"Cohort workbook written to: {output_paths['cohort_excel']}")
+                else:
+                    buffer = io.BytesIO()
+                    write_cohort_excel(buffer, commander_values, mahzor_averages)
+                    write_to_archive(archive, {COHORT_EXCEL_FILENAME: buffer.getvalue()})
+        else:
+            for _ in stale_partitions:
+                pass
+    finally:
+        if archive is not None:
+            archive.close()
+            print(f"Reports archive written to: {archive_path}")
+        if writer is not None:
+            failed_writes = stop_writer(writer)
+        if spill_dir is not None:
+            spill_dir.cleanup()
+
+    if failed_writes:
+        print(f"❌ Writing reports failed for commanders: {', '.join(failed_writes)}")
+        built = [commander for commander in built if commander not in failed_writes]
+
+    if incremental:
+        saved_keys = {commander: build_keys[commander] for commander in up_to_date + built}
+        if commanders is not None:
+            # a targeted run keeps the entries of the commanders it did not look at
+            saved_keys = {**{commander: key for commander, key in manifest.items()
+                             if commander not in selected}, **saved_keys}
+        save_build_manifest(saved_keys, output_paths["manifest"])
+
+    return len(built) == len(stale) and not missing
+
+
+def main(file_path=INPUT_PATH, workers: Optional[int] = DEFAULT_WORKERS,
+         incremental: bool = INCREMENTAL_BUILD, delta: bool = DELTA_INGESTION,
+         archive_path: Optional[str] = None, streaming: bool = STREAMING_AGGREGATION,
+         pipelined: bool = PIPELINED_WRITES, cohort_excel: bool = COHORT_EXCEL_EXPORT):
+    """
+    workers - number of worker processes for the commanders; 1 runs them in this process,
+    None uses all cores.
+    incremental - skip commanders whose rows, template and cohort aggregates did not change
+    since the last build (see BUILD_MANIFEST_PATH).
+    delta - take the stats from the saved aggregate state, updated with the new rows only
+    (see AGGREGATE_STATE_PATH).
+    archive_path - write all the reports into one zip archive instead of OUTPUT_PATH.
+    streaming - bounded memory: stream the workbook into aggregates and spill the rows to disk
+    (see STREAMING_MEMORY_BUDGET).
+    pipelined - overlap rendering with the file writes (see WRITER_THREADS).
+    cohort_excel - one workbook with every commander (COHORT_EXCEL_FILENAME) instead of a workbook per commander.
+    Set MASHOV_INSTRUMENT / MASHOV_PROFILE to get a JSON run report / cProfile stats (see instrumentation.py).
+    """
+    with instrumentation.instrumented_run():
+        run_reports(file_path, workers, incremental, delta, archive_path=archive_path, streaming=streaming,
+                    pipelined=pipelined, cohort_excel=cohort_excel)
 
-        generate_and_fill_commander_docx(df, placeholder_to_value, commander)
-        export_commander_excel(
-            df_commander=df_commander,
-            commander=commander,
-            placeholder_to_value=placeholder_to_value,
-            mahzor_averages=mahzor_averages,
-        )
 
 if __name__ == "__main__":
     main(INPUT_PATH)
@@ -0,0 +1,73 @@
+"""
+Round trips of the docx package writer (save_commander_docx() / write_docx_package()).
+
+    python -m pytest test_package_writer.py
+"""
+import io
+import os
+import zipfile
+
+import docx
+import pytest
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docxtpl import DocxTemplate
+
+import strol_code
+from constants import INPUT_PATH, TEMPLATE_PATH
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE = os.path.join(REPO_DIR, TEMPLATE_PATH)
+
+
+@pytest.fixture(scope="module")
+def cohort() -> dict:
+    return strol_code.prepare_cohort(strol_code.load_answers(os.path.join(REPO_DIR, INPUT_PATH)))
+
+
+@pytest.fixture
+def rendered_doc(cohort) -> DocxTemplate:
+    commander = next(iter(cohort["partitions"]))
+    df_commander = cohort["partitions"][commander]
+    placeholder_to_value = strol_code.build_commander_values(
+        df_commander, commander, cohort["commander_counts"][commander], cohort["mahzor_averages"],
+        cohort["general_stats"][commander], cohort["rankings"][commander])
+    return strol_code.render_commander_docx(df_commander, placeholder_to_value, commander, TEMPLATE)
+
+
+def save_with_package_writer(doc: DocxTemplate) -> bytes:
+    buffer = io.BytesIO()
+    strol_code.save_commander_docx(doc, buffer, TEMPLATE)
+    return buffer.getvalue()
+
+
+def save_with_python_docx(doc: DocxTemplate) -> bytes:
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def test_package_round_trips(rendered_doc):
+    written = save_with_package_writer(rendered_doc)
+    expected = save_with_python_docx(rendered_doc)
+
+    with zipfile.ZipFile(io.BytesIO(written)) as archive, zipfile.ZipFile(TEMPLATE) as template:
+        assert archive.testzip() is None
+        assert archive.namelist() == template.namelist()
+        # the static members are the template's own bytes
+        assert archive.read("word/_rels/document.xml.rels") == template.read("word/_rels/document.xml.rels")
+        assert archive.read("[Content_Types].xml") == template.read("[Content_Types].xml")
+        with zipfile.ZipFile(io.BytesIO(expected)) as reference:
+            assert archive.read("word/document.xml") == reference.read("word/document.xml")
+
+    reopened = docx.Document(io.BytesIO(written))
+    assert [p.text for p in reopened.paragraphs] == [p.text for p in docx.Document(io.BytesIO(expected)).paragraphs]
+
+
+def test_added_relationship_is_written(rendered_doc):
+    # e.g. a docxtpl RichText hyperlink: a new relationship, but no new part
+    rel_id = rendered_doc.docx.part.relate_to("https://example.com/", RT.HYPERLINK, is_external=True)
+
+    reopened = docx.Document(io.BytesIO(save_with_package_writer(rendered_doc)))
+    assert reopened.part.rels[rel_id].target_ref == "https://example.com/"
+    assert reopened.part.rels[rel_id].is_external
@@ -0,0 +1,72 @@
+"""
+Round trips of the parsed input cache (load_answers(..., cache_dir=)).
+
+    python -m pytest test_parsed_cache.py
+"""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import strol_code
+from constants import INPUT_PATH
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def answers_path(tmp_path) -> str:
+    path = tmp_path / "answers.xlsx"
+    shutil.copy(os.path.join(REPO_DIR, INPUT_PATH), path)
+    return str(path)
+
+
+def load_from_cache_only(answers_path: str, cache_dir: str, monkeypatch) -> pd.DataFrame:
+    def parse_workbook(*args, **kwargs):
+        raise AssertionError("the workbook was parsed, the cache missed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(strol_code, "excel_to_dataframe", parse_workbook)
+        return strol_code.load_answers(answers_path, cache_dir=cache_dir)
+
+
+def with_none_for_missing(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype(object).where(df.notna(), None)
+
+
+@pytest.mark.parametrize("cache_format", ["pickle", "feather"])
+def test_cache_round_trips(answers_path, tmp_path, monkeypatch, cache_format):
+    if cache_format == "feather":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(strol_code, "PARSED_CACHE_FORMAT", cache_format)
+    cache_dir = str(tmp_path / "cache")
+
+    parsed = strol_code.load_answers(answers_path, cache_dir=cache_dir)
+    cached = load_from_cache_only(answers_path, cache_dir, monkeypatch)
+
+    # feather gives NaN for the missing cells pickle keeps as None - both are missing to every stage
+    assert cached.dtypes.equals(parsed.dtypes)
+    pd.testing.assert_frame_equal(with_none_for_missing(cached), with_none_for_missing(parsed))
+    assert os.listdir(cache_dir) == [os.path.basename(strol_code.get_parsed_cache_path(answers_path, cache_dir))]
+
+
+def test_failed_save_keeps_the_run_and_the_old_cache(answers_path, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    strol_code.load_answers(answers_path, cache_dir=cache_dir)
+    old_caches = os.listdir(cache_dir)
+
+    # the workbook changed, and the new cache cannot be written
+    df = pd.read_excel(answers_path)
+    df.iloc[:-1].to_excel(answers_path, index=False)
+
+    def fail_to_write(*args, **kwargs):
+        raise ImportError("no writer")
+
+    expected = strol_code.load_answers(answers_path)
+    monkeypatch.setattr(pd.DataFrame, "to_pickle", fail_to_write)
+    parsed = strol_code.load_answers(answers_path, cache_dir=cache_dir)
+
+    pd.testing.assert_frame_equal(parsed, expected)
+    assert os.listdir(cache_dir) == old_caches